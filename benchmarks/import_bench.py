@@ -0,0 +1,116 @@
+"""
+Import time check of the cogs, with python -X importtime.
+
+Imports every cog package in a fresh interpreter, after discord.py and
+Red are imported so only what the cog itself costs is counted, and
+prints the median cumulative import time of the cog, its slowest
+modules and what importing the deferred dependencies would have cost.
+Exits with 1 if loading a cog imports one of the dependencies time.py
+only imports on the first parse.
+
+Needs Red-DiscordBot installed (the cogs import it), the cogs are
+imported from the root of the repo.
+
+Usage:
+    python benchmarks/import_bench.py                    countdown and giveaway
+    python benchmarks/import_bench.py --cogs clock --rounds 10
+"""
+
+# stdlib
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COGS = ["countdown", "giveaway", "clock", "watch2gether"]
+# imported before the cog, the cog isn't charged for them
+PRELUDE = ["discord", "discord.ext.commands", "discord.ext.tasks",
+           "redbot.core", "redbot.core.commands", "redbot.core.utils.menus"]
+# imported by time.py on the first parse instead of on load
+DEFERRED = ["parsedatetime", "dateutil.relativedelta"]
+MARKER = "-- import_bench --"
+
+
+def run(modules):
+    '''
+    Imports the modules after the prelude in a fresh interpreter
+
+    Returns:
+    --------
+    Dict[str, Tuple[int, int]]
+        The module name to its self and cumulative import time in
+        microseconds, for the modules imported after the prelude
+    '''
+    code = "\n".join([
+        "import sys",
+        *(f"import {module}" for module in PRELUDE),
+        f"sys.stderr.write({MARKER!r} + '\\n')",
+        *(f"import {module}" for module in modules),
+    ])
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             cwd=ROOT, capture_output=True, text=True)
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    lines = process.stderr.split(MARKER, 1)[1].splitlines()
+    times = {}
+    for line in lines:
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+
+def median_times(modules, rounds):
+    '''
+    The median self and cumulative time of every module over the rounds
+    '''
+    runs = [run(modules) for _ in range(rounds)]
+    names = set().union(*runs)
+    return {name: tuple(statistics.median(times[name][i] for times in runs if name in times)
+                        for i in (0, 1))
+            for name in names}
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the import time of the cogs")
+    parser.add_argument("--cogs", nargs="+", choices=COGS, default=["countdown", "giveaway"],
+                        help="the cogs to import")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="fresh interpreters per cog, the median is printed")
+    parser.add_argument("--top", type=int, default=5,
+                        help="how many of the slowest modules of a cog are printed")
+    args = parser.parse_args()
+
+    deferred = median_times(DEFERRED, args.rounds)
+    deferred_cost = sum(deferred[name][1] for name in DEFERRED if name in deferred)
+
+    packages = {dependency.split(".")[0] for dependency in DEFERRED}
+    failed = False
+    for cog in args.cogs:
+        times = median_times([cog], args.rounds)
+        loaded = sorted(name for name in times if name.split(".")[0] in packages)
+        print(f"{cog:>13} imported in {times[cog][1] / 1e3:.1f}ms (median of {args.rounds})")
+        slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for name, (own, cumulative) in slowest:
+            print(f"{'':>15}{name:<40} self {own / 1e3:>6.1f}ms  cumulative {cumulative / 1e3:>6.1f}ms")
+        if loaded:
+            failed = True
+            print(f"{'':>15}imports {', '.join(loaded)} on load, time.py should only import them when parsing")
+    print()
+    print(f"Importing {', '.join(DEFERRED)} takes {deferred_cost / 1e3:.1f}ms, "
+          "the cogs pay it on the first parse instead of on load")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""
+Benchmarks and differential checks for the time.py copies of the cogs.
+
+Runs the phrases and delta pairs of time_corpus.json through ShortTime,
+HumanTime, Time.convert, FutureTime.convert, UserFriendlyTime.convert
+and human_timedelta of every copy, exits with 1 if any copy gives a
+different result than the one recorded in the corpus and prints ops/sec
+and latency percentiles otherwise.
+
+Before that it checks FastTime against parsedatetime: every generated
+phrase FastTime understands is parsed again with FastTime turned off and
+both results have to be the same.
+
+It runs offline, the converters get a fake ctx that only has
+message.created_at. Only discord.py, parsedatetime and python-dateutil
+need to be installed, the cogs themselves (and Red) are not imported.
+
+Usage:
+    python benchmarks/time_bench.py                check and benchmark
+    python benchmarks/time_bench.py --check        only check the outputs
+    python benchmarks/time_bench.py --record       re-record the outputs
+                                                   from the countdown copy
+"""
+
+# stdlib
+import sys
+import json
+import time
+import types
+import asyncio
+import argparse
+import datetime
+import importlib
+import contextlib
+from io import StringIO
+from pathlib import Path
+
+# discord.py
+# imported up front so the import times printed are the ones of time.py alone
+from discord.ext import commands # noqa: F401
+
+
+ROOT = Path(__file__).resolve().parent.parent
+CORPUS = Path(__file__).resolve().parent / "time_corpus.json"
+
+# The cogs with a copy of time.py
+COPIES = ["countdown", "giveaway"]
+REFERENCE = "countdown"
+
+
+class FakeContext:
+    '''
+    Just enough of a commands.Context for the converters of time.py
+    '''
+    def __init__(self, created_at):
+        self.message = types.SimpleNamespace(created_at=created_at)
+
+
+
+def load_copy(name):
+    '''
+    Imports the time.py of the given cog without running the __init__.py
+    of the cog (which needs Red)
+
+    Parameters:
+    -----------
+    name: str
+        The folder name of the cog
+
+    Returns:
+    --------
+    module
+        The time module of that cog
+    '''
+    package = types.ModuleType(f"_bench_{name}")
+    package.__path__ = [str(ROOT / name)]
+    sys.modules[package.__name__] = package
+    return importlib.import_module(f"{package.__name__}.time")
+
+
+
+# The times the FastTime phrases are parsed at, around the ends of
+# months and years, a leap day and with or without microseconds
+FAST_ANCHORS = [
+    datetime.datetime(2026, 10, 19, 12, 0, 0, 123456),
+    datetime.datetime(2026, 10, 31, 23, 59, 59, 999999),
+    datetime.datetime(2026, 12, 31, 22, 30, 0),
+    datetime.datetime(2028, 2, 28, 8, 15, 30, 500000),
+    datetime.datetime(2028, 2, 29, 0, 0, 0),
+    datetime.datetime(2027, 1, 4, 17, 45, 10, 1),
+]
+
+
+
+def fast_phrases():
+    '''
+    Phrases around everything FastTime understands, including ones it
+    has to give up on
+    '''
+    amounts = ["1", "2", "3", "5", "12", "30", "45", "59", "100", "365", "a", "an"]
+    units = ["second", "seconds", "sec", "secs", "minute", "minutes", "min", "mins",
+             "hour", "hours", "hr", "day", "days", "week", "weeks", "month", "years"]
+    phrases = ["tomorrow", "Tomorrow", "tomorrow "]
+    for amount in amounts:
+        for unit in units:
+            phrases += [f"{amount} {unit}", f"in {amount} {unit}", f"IN {amount} {unit.upper()}"]
+    times = ["", " 5pm", " 5 PM", " 12am", " 12pm", " 5:30pm", " at 11am", " at 9:05 am",
+             " 0:00", " 17:45", " 17:45:10", " 23:59:59", " 13pm", " 25:00", " 10:60"]
+    weekdays = ["monday", "mon", "Tuesday", "tue", "tues", "wednesday", "wed", "thursday",
+                "thu", "friday", "fri", "saturday", "sat", "sunday", "sun", "someday"]
+    for weekday in weekdays:
+        phrases += [f"next {weekday}{time}" for time in times]
+    dates = ["2030-05-01", "2030-5-1", "2026-12-31", "2028-02-29", "2027-02-29", "2030-13-01"]
+    for date in dates:
+        phrases += [f"{date}{time}" for time in times if ":" in time or not time]
+    return phrases
+
+
+
+def check_fast(module):
+    '''
+    Compares HumanTime.parse and UserFriendlyTime.parse with and without
+    FastTime for every generated phrase FastTime understands
+
+    Returns:
+    --------
+    Tuple[int, int]
+        The number of compared parses and of mismatches
+    '''
+    fast_parse = module.FastTime.parse
+    # the classmethod itself, to put it back after turning FastTime off
+    descriptor = module.FastTime.__dict__["parse"]
+
+    def parse_all(parse, argument, now):
+        try:
+            return parse(argument, now)
+        except Exception as exc:
+            return error(exc)
+
+    compared = 0
+    failed = []
+    for now in FAST_ANCHORS:
+        for argument in fast_phrases():
+            for parser in (module.HumanTime, module.UserFriendlyTime):
+                cleaned = parser.clean(argument) if parser is module.UserFriendlyTime else argument
+                if fast_parse(cleaned, now) is None:
+                    continue
+                fast = parse_all(parser.parse, argument, now)
+                module.FastTime.parse = staticmethod(lambda argument, now: None)
+                try:
+                    slow = parse_all(parser.parse, argument, now)
+                finally:
+                    module.FastTime.parse = descriptor
+                compared += 1
+                if fast != slow:
+                    failed.append((parser.__name__, argument, now, slow, fast))
+
+    for name, argument, now, slow, fast in failed[:5]:
+        print(f"{'':>15}{name} {argument!r} at {now} -> parsedatetime {slow!r}, FastTime {fast!r}")
+    return compared, len(failed)
+
+
+
+def parse_datetime(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+
+def error(exc):
+    return {"error": f"{type(exc).__name__}: {exc}"}
+
+
+
+def run_short(module, entry):
+    now = parse_datetime(entry["now"])
+    try:
+        return module.ShortTime(entry["argument"], now=now).dt.isoformat()
+    except Exception as exc:
+        return error(exc)
+
+
+
+def run_human(module, entry):
+    now = parse_datetime(entry["now"])
+    try:
+        return module.HumanTime(entry["argument"], now=now).dt.isoformat()
+    except Exception as exc:
+        return error(exc)
+
+
+
+async def run_converter(converter, entry):
+    ctx = FakeContext(parse_datetime(entry["now"]))
+    try:
+        result = await converter.convert(ctx, entry["argument"])
+    except Exception as exc:
+        return error(exc)
+    return result.dt.isoformat()
+
+
+
+async def run_time(module, entry):
+    return await run_converter(module.Time, entry)
+
+
+
+async def run_future(module, entry):
+    return await run_converter(module.FutureTime, entry)
+
+
+
+async def run_friendly(module, entry):
+    ctx = FakeContext(parse_datetime(entry["now"]))
+    converter = module.UserFriendlyTime(default="\u2026")
+    try:
+        # convert prints the traceback of every failed parse
+        with contextlib.redirect_stderr(StringIO()):
+            result = await converter.convert(ctx, entry["argument"])
+    except Exception as exc:
+        return error(exc)
+    return [result.dt.isoformat(), result.arg]
+
+
+
+def run_delta(module, entry):
+    return module.human_timedelta(parse_datetime(entry["dt"]),
+                                  source=parse_datetime(entry["now"]),
+                                  **entry["kwargs"])
+
+
+
+async def outputs(module, corpus):
+    '''
+    Runs every entry of the corpus through the copy
+
+    Returns:
+    --------
+    dict
+        A dict of the function name to the list of outputs
+    '''
+    if hasattr(module, "parse_cache"):
+        module.parse_cache.clear()
+    return {
+        "ShortTime": [run_short(module, entry) for entry in corpus["phrases"]],
+        "HumanTime": [run_human(module, entry) for entry in corpus["phrases"]],
+        "Time": [await run_time(module, entry) for entry in corpus["phrases"]],
+        "FutureTime": [await run_future(module, entry) for entry in corpus["phrases"]],
+        "UserFriendlyTime": [await run_friendly(module, entry) for entry in corpus["phrases"]],
+        "human_timedelta": [run_delta(module, entry) for entry in corpus["deltas"]],
+    }
+
+
+
+async def check(modules, corpus):
+    '''
+    Compares the outputs of every copy to the ones recorded in the corpus
+
+    Returns:
+    --------
+    int
+        The number of mismatches
+    '''
+    mismatches = 0
+    for name, module in modules.items():
+        results = await outputs(module, corpus)
+        for function, values in results.items():
+            if function == "human_timedelta":
+                entries = corpus["deltas"]
+                expected = [entry["expected"] for entry in entries]
+            else:
+                entries = corpus["phrases"]
+                expected = [entry[function] for entry in entries]
+            failed = [(entry, want, got) for entry, want, got in zip(entries, expected, values)
+                      if want != got]
+            mismatches += len(failed)
+            status = "ok" if not failed else f"{len(failed)} mismatches"
+            print(f"{name:>13} {function:<17} {len(values):>5} entries  {status}")
+            for entry, want, got in failed[:5]:
+                print(f"{'':>15}{entry} -> expected {want!r}, got {got!r}")
+    return mismatches
+
+
+
+async def record(modules, corpus):
+    '''
+    Stores the outputs of the reference copy in the corpus
+    '''
+    results = await outputs(modules[REFERENCE], corpus)
+    for function in ("ShortTime", "HumanTime", "Time", "FutureTime", "UserFriendlyTime"):
+        for entry, value in zip(corpus["phrases"], results[function]):
+            entry[function] = value
+    for entry, value in zip(corpus["deltas"], results["human_timedelta"]):
+        entry["expected"] = value
+
+
+
+def dump(corpus):
+    '''
+    Writes the corpus with one entry per line so it diffs well
+    '''
+    lines = ["{"]
+    sections = list(corpus.items())
+    for index, (section, entries) in enumerate(sections):
+        lines.append(f"    {json.dumps(section)}: [")
+        lines.append(",\n".join(f"        {json.dumps(entry, ensure_ascii=False)}" for entry in entries))
+        lines.append("    ]" + ("," if index < len(sections) - 1 else ""))
+    lines.append("}")
+    CORPUS.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+
+def percentile(timings, percent):
+    return timings[min(len(timings) - 1, int(len(timings) * percent / 100))]
+
+
+
+def report(name, function, timings):
+    timings.sort()
+    total = sum(timings)
+    ops = len(timings) / (total / 1e9) if total else float("inf")
+    p50, p90, p99 = (percentile(timings, p) / 1e3 for p in (50, 90, 99))
+    print(f"{name:>13} {function:<17} {ops:>10,.0f} ops/s  "
+          f"p50 {p50:>8.1f}us  p90 {p90:>8.1f}us  p99 {p99:>8.1f}us")
+
+
+
+async def benchmark(modules, corpus, rounds, warm):
+    '''
+    Times every call of every function over the given number of rounds.
+    The parse cache is cleared before every round unless warm is set,
+    so by default the numbers are the ones of a first parse.
+    '''
+    print(f"{'copy':>13} {'function':<17} {'(' + str(rounds) + ' rounds)':>16}")
+    for name, module in modules.items():
+        runners = [
+            ("ShortTime", run_short, corpus["phrases"]),
+            ("HumanTime", run_human, corpus["phrases"]),
+            ("Time", run_time, corpus["phrases"]),
+            ("FutureTime", run_future, corpus["phrases"]),
+            ("UserFriendlyTime", run_friendly, corpus["phrases"]),
+            ("human_timedelta", run_delta, corpus["deltas"]),
+        ]
+        for function, runner, entries in runners:
+            timings = []
+            for _ in range(rounds):
+                if not warm and hasattr(module, "parse_cache"):
+                    module.parse_cache.clear()
+                for entry in entries:
+                    start = time.perf_counter_ns()
+                    result = runner(module, entry)
+                    if asyncio.iscoroutine(result):
+                        await result
+                    timings.append(time.perf_counter_ns() - start)
+            report(name, function, timings)
+
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmarks and checks the time.py copies")
+    parser.add_argument("--check", action="store_true",
+                        help="only check the outputs, don't benchmark")
+    parser.add_argument("--record", action="store_true",
+                        help="re-record the expected outputs from the countdown copy")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="how many times the corpus is run for the benchmark")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep the parse cache between rounds")
+    parser.add_argument("--copies", nargs="+", choices=COPIES, default=COPIES,
+                        help="the cogs whose time.py is run")
+    args = parser.parse_args()
+
+    modules = {}
+    for name in args.copies:
+        start = time.perf_counter()
+        modules[name] = load_copy(name)
+        print(f"{name:>13} time.py imported in {(time.perf_counter() - start) * 1e3:.1f}ms")
+    print()
+
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    if args.record:
+        if REFERENCE not in modules:
+            parser.error(f"--record needs the {REFERENCE} copy")
+        await record(modules, corpus)
+        dump(corpus)
+        print(f"Recorded {len(corpus['phrases'])} phrases and {len(corpus['deltas'])} delta pairs")
+        return 0
+
+    mismatches = 0
+    for name, module in modules.items():
+        compared, failed = check_fast(module)
+        mismatches += failed
+        status = "ok" if not failed else f"{failed} mismatches"
+        print(f"{name:>13} {'FastTime':<17} {compared:>5} parses   {status}")
+    mismatches += await check(modules, corpus)
+    print()
+    if mismatches:
+        print(f"{mismatches} outputs differ from the corpus")
+        return 1
+    if not args.check:
+        await benchmark(modules, corpus, args.rounds, args.warm)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
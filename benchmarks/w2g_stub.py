@@ -0,0 +1,203 @@
+"""
+An offline stand-in for the Watch2Gether API and a load benchmark of
+the client of the watch2gether cog against it.
+
+The stub answers POST /rooms/create.json like w2g.tv does and can be
+made slow or flaky: it answers some requests with 5xx errors, 429s
+with a Retry-After or a non-JSON page.
+
+Usage:
+    python benchmarks/w2g_stub.py serve --port 8080 --error-rate 0.1
+        runs the stub until stopped, for W2GClient(base_url="http://127.0.0.1:8080")
+    python benchmarks/w2g_stub.py bench --requests 2000 --concurrency 50
+        runs the stub and the client against it and prints latency percentiles,
+        how many requests the stub got (retries included) and the outcomes
+"""
+
+# stdlib
+import sys
+import time
+import types
+import random
+import asyncio
+import argparse
+import importlib
+import secrets
+from collections import Counter
+from pathlib import Path
+
+# discord.py
+from aiohttp import web
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_api():
+    '''
+    Imports watch2gether/api.py without running the __init__.py of the
+    cog (which needs Red)
+    '''
+    package = types.ModuleType("_bench_watch2gether")
+    package.__path__ = [str(ROOT / "watch2gether")]
+    sys.modules[package.__name__] = package
+    return importlib.import_module(f"{package.__name__}.api")
+
+
+
+def make_app(*, latency:float=0.0, error_rate:float=0.0, throttle_rate:float=0.0,
+             garbage_rate:float=0.0, seed:int=None) -> web.Application:
+    '''
+    The stub of the Watch2Gether API
+
+    Parameters:
+    -----------
+    latency: float
+        Seconds every answer takes
+    error_rate, throttle_rate, garbage_rate: float
+        The share of requests answered with a 5xx, with a 429 and
+        with a HTML page instead of JSON
+    seed: int
+        Seeds the randomness of the failures, to replay a run
+    '''
+    rng = random.Random(seed)
+    stats = Counter()
+
+    async def create_room(request):
+        data = await request.post()
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if not data.get("w2g_api_key"):
+            stats["403"] += 1
+            return web.json_response({"error": "invalid api key"}, status=403)
+        roll = rng.random()
+        if roll < error_rate:
+            status = rng.choice([500, 502, 503])
+            stats[str(status)] += 1
+            return web.Response(status=status, text="<html>Server Error</html>")
+        roll -= error_rate
+        if roll < throttle_rate:
+            stats["429"] += 1
+            return web.Response(status=429, headers={"Retry-After": "0.1"})
+        roll -= throttle_rate
+        if roll < garbage_rate:
+            stats["garbage"] += 1
+            return web.Response(text="<html>Maintenance</html>", content_type="text/html")
+        stats["200"] += 1
+        return web.json_response({"streamkey": secrets.token_hex(12),
+                                  "share": data.get("share")})
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/rooms/create.json", create_room)
+    return app
+
+
+
+async def start(app, host:str="127.0.0.1", port:int=0):
+    '''
+    Starts serving the app
+
+    Returns:
+    --------
+    Tuple[web.AppRunner, str]
+        The runner, to stop it, and the base URL the app is served at
+    '''
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+
+def percentile(timings, percent):
+    return timings[min(len(timings) - 1, int(len(timings) * percent / 100))]
+
+
+
+async def bench(args):
+    api = load_api()
+    app = make_app(latency=args.latency, error_rate=args.error_rate,
+                   throttle_rate=args.throttle_rate, garbage_rate=args.garbage_rate,
+                   seed=args.seed)
+    runner, base_url = await start(app)
+    client = api.W2GClient(base_url=base_url, backoff=args.backoff, max_backoff=args.backoff * 16)
+    outcomes = Counter()
+    timings = []
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with slots:
+            begin = time.perf_counter()
+            try:
+                await client.create_room("stub-key", f"https://example.com/{i}")
+            except api.W2GUnavailable:
+                outcomes["unavailable"] += 1
+            except api.W2GError:
+                outcomes["refused"] += 1
+            else:
+                outcomes["created"] += 1
+            timings.append(time.perf_counter() - begin)
+
+    begin = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+    finally:
+        elapsed = time.perf_counter() - begin
+        await client.close()
+        await runner.cleanup()
+
+    timings.sort()
+    p50, p90, p99 = (percentile(timings, p) * 1e3 for p in (50, 90, 99))
+    print(f"{args.requests} rooms, {args.concurrency} at once, in {elapsed:.2f}s "
+          f"({args.requests / elapsed:,.0f} rooms/s)")
+    print(f"latency p50 {p50:.1f}ms  p90 {p90:.1f}ms  p99 {p99:.1f}ms")
+    print("outcomes: " + ", ".join(f"{name} {count}" for name, count in sorted(outcomes.items())))
+    print("stub got: " + ", ".join(f"{name} {count}" for name, count in sorted(app["stats"].items())))
+    print(f"circuit breaker: {client.breaker.state}")
+
+
+
+async def serve(args):
+    app = make_app(latency=args.latency, error_rate=args.error_rate,
+                   throttle_rate=args.throttle_rate, garbage_rate=args.garbage_rate,
+                   seed=args.seed)
+    runner, base_url = await start(app, args.host, args.port)
+    print(f"Serving the Watch2Gether stub at {base_url}, stop it with Ctrl+C")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await runner.cleanup()
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Watch2Gether API stub and client benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the stub until stopped")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    bench_parser = commands.add_parser("bench", help="benchmark the client against the stub")
+    bench_parser.add_argument("--requests", type=int, default=1000)
+    bench_parser.add_argument("--concurrency", type=int, default=50)
+    bench_parser.add_argument("--backoff", type=float, default=0.05,
+                              help="the base backoff of the client, small so runs stay short")
+    for sub in (serve_parser, bench_parser):
+        sub.add_argument("--latency", type=float, default=0.0)
+        sub.add_argument("--error-rate", type=float, default=0.0)
+        sub.add_argument("--throttle-rate", type=float, default=0.0)
+        sub.add_argument("--garbage-rate", type=float, default=0.0)
+        sub.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args) if args.command == "serve" else bench(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
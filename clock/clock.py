@@ -1,6 +1,15 @@
 
 # stdlib
-from datetime import datetime
+import re
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from time import monotonic
+from typing import Dict, List, Optional, Set, Tuple
 
 # discord.py
 import discord
@@ -11,63 +20,789 @@ from redbot.core import Config, commands, checks
 
 # Current Plugin
 import pytz
-from pytz import all_timezones
+from pytz import all_timezones, common_timezones
 
 
+log = logging.getLogger("red.clock")
+
 __author__ = 'AXVin'
-__version__ = '1.0.3'
+__version__ = '1.1.0'
 
 
 channel_defaults = {
     "timezone": None,
-    "time_format": "%A, %I:%M %p (%Z)"
+    "time_format": "%A, %I:%M %p (%Z)",
+    "renamed_at": None,
+    "guild_id": None
+}
+# renamed_at: float  - when the clock last renamed the channel, as a UTC timestamp
+# guild_id: int      - the guild of the channel, to tell a deleted channel from
+#                      one whose guild is unavailable
+
+guild_defaults = {
+    "board_channel": None,
+    "board_message": None,
+    "board_rows": []
+}
+# board_channel: int         - the channel of the world clock board
+# board_message: int         - the message of the board, None if it isn't posted
+# board_rows: List[List[str]] - the [timezone, time_format] shown on each row
+
+# Discord allows 2 renames of a channel per 10 minutes
+CHANNEL_RENAME_RATE = 2
+CHANNEL_RENAME_PER = 600.0
+# The longest a clock goes without being rendered, even formats which only
+# show the day are looked at this often so UTC offset (DST) changes show up
+MAX_RESOLUTION = 3600
+# Seconds over which the clocks that are outdated when the cog loads are
+# renamed, instead of renaming all of them at once
+STARTUP_SPREAD = 60.0
+# The rows a board can have, the characters its description can have and
+# the characters the format of one of its rows can have, formats are any
+# text so the rows alone don't keep it within the embed description limit
+BOARD_MAX_ROWS = 40
+BOARD_MAX_LENGTH = 4000
+BOARD_FORMAT_LENGTH = 100
+# How many clock renames and board edits are sent at once, across all guilds
+CLOCK_CONCURRENCY = 5
+# Seconds between the passes clearing the config of deleted clock channels
+RECONCILE_INTERVAL = 3600
+# How many clock channels create-many makes at once, and at most in total
+CREATE_CONCURRENCY = 3
+CREATE_MAX = 25
+
+FORMAT_DIRECTIVE = re.compile(r"%[-_0^#]?(.)")
+# Directives by how often the text they render changes, a channel name
+# can't be renamed more than twice per 10 minutes so seconds are
+# looked at every minute too. Unknown directives are assumed to change
+# every minute
+MINUTE_DIRECTIVES = set("MRScTXrsf+")
+HOUR_DIRECTIVES = set("HIklpP")
+DAY_DIRECTIVES = set("aAbBhdejmyYCgGuUVwWxDFZz%nt")
+
+# Common abbreviations which aren't tz database names themselves
+TIMEZONE_ABBREVIATIONS = {
+    "pt": "America/Los_Angeles", "pst": "America/Los_Angeles", "pdt": "America/Los_Angeles",
+    "mt": "America/Denver", "mdt": "America/Denver",
+    "ct": "America/Chicago", "cst": "America/Chicago", "cdt": "America/Chicago",
+    "et": "America/New_York", "edt": "America/New_York",
+    "akst": "America/Anchorage", "akdt": "America/Anchorage",
+    "bst": "Europe/London", "ist": "Asia/Kolkata", "sgt": "Asia/Singapore",
+    "hkt": "Asia/Hong_Kong", "jst": "Asia/Tokyo", "kst": "Asia/Seoul",
+    "aest": "Australia/Sydney", "aedt": "Australia/Sydney",
+    "nzst": "Pacific/Auckland", "nzdt": "Pacific/Auckland",
 }
+# How many timezones are suggested when one isn't found
+TIMEZONE_SUGGESTIONS = 3
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name:str):
+    '''
+    pytz.timezone, without normalizing the name again on every call
+    '''
+    return pytz.timezone(name)
+
+
+
+def format_resolution(fmt:str) -> int:
+    '''
+    How many seconds apart the times at which the given format can
+    render a different text are, aligned to the local wall clock
+
+    Returns:
+    --------
+    int
+        60 for formats showing minutes, 3600 otherwise
+    '''
+    for directive in FORMAT_DIRECTIVE.findall(fmt):
+        if directive not in HOUR_DIRECTIVES and directive not in DAY_DIRECTIVES:
+            return 60
+    return MAX_RESOLUTION
+
+
+
+def next_change(local:datetime, fmt:str) -> datetime:
+    '''
+    The next time at which the given format can render a different text
+
+    Parameters:
+    -----------
+    local: datetime
+        The current time in the timezone of the clock
+    fmt: str
+        The strftime format of the clock
+
+    Returns:
+    --------
+    datetime
+        The time, in UTC, of the next minute or hour of the local wall clock
+    '''
+    resolution = format_resolution(fmt)
+    elapsed = local.minute * 60 + local.second + local.microsecond / 1e6
+    remaining = resolution - elapsed % resolution
+    return local.astimezone(pytz.utc) + timedelta(seconds=remaining)
+
+
+
+@lru_cache(maxsize=1024)
+def longest_render(timezone_name:str, fmt:str) -> int:
+    '''
+    The length of the longest text the format renders to in the timezone,
+    names of months and weekdays, unpadded numbers and UTC offsets change
+    it over the year
+
+    Returns:
+    --------
+    int
+        The longest length, over every month, weekday and half of the day
+    '''
+    timezone = get_timezone(timezone_name)
+    year = datetime.now(pytz.utc).year
+    longest = 0
+    for month in range(1, 13):
+        # a week of one digit days and a week of two digit days
+        for day in itertools.chain(range(1, 8), range(22, 29)):
+            for hour in (0, 12, 23):
+                local = timezone.localize(datetime(year, month, day, hour, 59, 59))
+                try:
+                    longest = max(longest, len(local.strftime(fmt)))
+                except ValueError:
+                    return len("invalid format")
+    return longest
+
+
+
+def render(timezone_name:str, fmt:str, now:datetime) -> Tuple[Optional[str], datetime]:
+    '''
+    Renders a clock
+
+    Parameters:
+    -----------
+    timezone_name: str
+        The timezone of the clock
+    fmt: str
+        The strftime format of the clock
+    now: datetime
+        The current time in UTC
+
+    Returns:
+    --------
+    Tuple[Optional[str], datetime]
+        The text of the clock, None if the format is invalid, and when
+        that text can next change
+    '''
+    local = now.astimezone(get_timezone(timezone_name))
+    try:
+        return local.strftime(fmt).strip(), next_change(local, fmt)
+    except ValueError:
+        return None, now + timedelta(seconds=MAX_RESOLUTION)
+
+
+
+class RenameBudget:
+    """
+    Keeps track of the renames done in each channel so a clock is never
+    renamed more often than Discord allows
+    """
+
+    def __init__(self, rate:int=CHANNEL_RENAME_RATE, per:float=CHANNEL_RENAME_PER):
+        self.rate = rate
+        self.per = per
+        self._renames: Dict[int, deque] = defaultdict(deque)
+
+
+    def _expire(self, channel_id:int, now:float) -> deque:
+        renames = self._renames[channel_id]
+        while renames and now - renames[0] >= self.per:
+            renames.popleft()
+        return renames
+
+
+    def acquire(self, channel_id:int) -> bool:
+        '''
+        Uses one rename from the channel's budget
+
+        Returns:
+        --------
+        bool
+            False if the channel has no renames left for now
+        '''
+        now = monotonic()
+        renames = self._expire(channel_id, now)
+        if len(renames) >= self.rate:
+            return False
+        renames.append(now)
+        return True
+
+
+    def record(self, channel_id:int, ago:float):
+        '''
+        Counts a rename done the given number of seconds ago, before
+        this budget existed (e.g. before a restart)
+        '''
+        if ago < self.per:
+            renames = self._renames[channel_id]
+            renames.append(monotonic() - ago)
+            self._renames[channel_id] = deque(sorted(renames))
+
+
+    def retry_after(self, channel_id:int) -> float:
+        '''
+        Seconds until the channel can be renamed again, 0 if it can be now
+        '''
+        now = monotonic()
+        renames = self._expire(channel_id, now)
+        if len(renames) < self.rate:
+            return 0.0
+        return renames[0] + self.per - now
+
+
+class Cycle:
+    """
+    The edits queued by one pass of the clocks loop, to time how
+    long it takes until all of them are done
+    """
+
+    def __init__(self):
+        self.start = monotonic()
+        self.jobs = 0
+        self.pending = 0
+
+
+
+class TimezoneIndex:
+    """
+    Case insensitive lookup of timezone names, the cities in them
+    (e.g. "new york") and common abbreviations, with suggestions
+    from a trigram index for the names that aren't found
+    """
+
+    def __init__(self):
+        # normalized name: timezone
+        self.names: Dict[str, str] = {}
+        # trigram: the normalized names having it
+        self.trigrams: Dict[str, List[str]] = defaultdict(list)
+        # normalized name: how many trigrams it has
+        self.sizes: Dict[str, int] = {}
+        for timezone in all_timezones:
+            self.names[self.normalize(timezone)] = timezone
+        # the cities of common timezones win over the ones of their aliases
+        for timezone in itertools.chain(common_timezones, all_timezones):
+            self.names.setdefault(self.normalize(timezone.rpartition("/")[2]), timezone)
+        for abbreviation, timezone in TIMEZONE_ABBREVIATIONS.items():
+            self.names.setdefault(abbreviation, timezone)
+        for name in self.names:
+            trigrams = self.split(name)
+            self.sizes[name] = len(trigrams)
+            for trigram in trigrams:
+                self.trigrams[trigram].append(name)
+
+
+    @staticmethod
+    def normalize(name:str) -> str:
+        return "_".join(name.lower().replace("-", " ").split())
+
+
+    @staticmethod
+    def split(name:str) -> Set[str]:
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+    def get(self, name:str) -> Optional[str]:
+        '''
+        The timezone with the given name, city or abbreviation
+        '''
+        return self.names.get(self.normalize(name))
+
+
+    def suggest(self, name:str, limit:int=TIMEZONE_SUGGESTIONS) -> List[str]:
+        '''
+        The timezones whose names are the most similar to the given one
+
+        Only the names sharing a trigram with it are looked at and
+        they are ranked by the Jaccard similarity of their trigrams
+        '''
+        trigrams = self.split(self.normalize(name))
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self.trigrams.get(trigram, ()))
+
+        size = len(trigrams)
+        sizes = self.sizes
+        def similarity(item):
+            candidate, common = item
+            return common / (size + sizes[candidate] - common)
+
+        # a few more than needed, cities and abbreviations can share a timezone
+        best = heapq.nlargest(limit * 3, shared.items(), key=similarity)
+        suggestions = []
+        for candidate, _ in best:
+            timezone = self.names[candidate]
+            if timezone not in suggestions:
+                suggestions.append(timezone)
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+
+@lru_cache(maxsize=None)
+def get_timezone_index() -> TimezoneIndex:
+    '''
+    The TimezoneIndex, built on first use instead of on every load of the cog
+    '''
+    return TimezoneIndex()
+
 
 
 class TimeZone(commands.Converter):
 
     async def convert(self, ctx, argument):
-        if argument.title() not in all_timezones:
-            raise commands.BadArgument("Couldn't find that timezone. Look for it in "
+        index = get_timezone_index()
+        timezone = index.get(argument)
+        if timezone is None:
+            suggestions = index.suggest(argument)
+            message = "Couldn't find that timezone. "
+            if suggestions:
+                message += f"Did you mean {', '.join(f'`{name}`' for name in suggestions)}? "
+            raise commands.BadArgument(message + "Look for it in "
                                        "https://en.wikipedia.org/wiki/List_of_tz_database_time_zones")
-        return argument
+        return timezone
 
 
 class Clock(commands.Cog):
-    """Display time for timezones as voice channels"""
+    """Display time for timezones as voice channels or on a board"""
 
     def __init__(self, bot):
         self.bot = bot
         self.db = Config.get_conf(self, 675875687587, force_registration=True)
         self.db.register_channel(**channel_defaults)
+        self.db.register_guild(**guild_defaults)
+        self.rename_budget = RenameBudget()
+        # (timezone, time_format): the rendered text and when it can next change,
+        # shared by the clock channels and the rows of the boards
+        self.rendered: Dict[Tuple[str, str], Tuple[Optional[str], datetime]] = {}
+        # The clocks are grouped by what they show so every distinct name
+        # is rendered once and then given to all the channels showing it
+        # channel_id: (timezone, time_format)
+        self.clocks: Dict[int, Tuple[str, str]] = {}
+        # (timezone, time_format): the channel_ids showing it
+        self.groups: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        # (timezone, time_format): when that name can next change
+        self.due: Dict[Tuple[str, str], datetime] = {}
+        # channel_id: when a clock that was out of renames is retried
+        self.retries: Dict[int, datetime] = {}
+        # guild_id: {channel_id, message_id, rows} of the posted boards
+        self.boards: Dict[int, dict] = {}
+        # guild_id: when the board can next change
+        self.board_due: Dict[int, datetime] = {}
+        # guild_id: the text the board shows now
+        self.board_text: Dict[int, str] = {}
+        # The edits are queued in a lane per guild, every lane sends one
+        # edit at a time and at most CLOCK_CONCURRENCY are sent at once
+        # in total, so a slow or ratelimited guild only delays its own clocks
+        # guild_id: the (key, job, cycle) waiting in that guild
+        self.lanes: Dict[int, deque] = defaultdict(deque)
+        # guild_id: the task sending the edits of that guild
+        self.lane_tasks: Dict[int, asyncio.Task] = {}
+        # ("clock", channel_id) or ("board", guild_id) of every queued edit
+        self.queued: Set[Tuple[str, int]] = set()
+        self.edit_slots = asyncio.Semaphore(CLOCK_CONCURRENCY)
+        # seconds the last finished cycle took and how many edits it had
+        self.last_cycle: Optional[Tuple[float, int]] = None
+        # channel_ids with a clock config the last reconcile pass couldn't find
+        self.missing: Set[int] = set()
+        self._wakeup = asyncio.Event()
         self.update_channels.start()
+        self.reconcile_clocks.start()
 
 
     async def cog_unload(self):
-        self.update_channels.stop()
+        # the loop sleeps inside of its iteration, stop() would wait for it
+        self.update_channels.cancel()
+        self.reconcile_clocks.cancel()
+        for task in self.lane_tasks.values():
+            task.cancel()
 
 
-    @tasks.loop(seconds=300)
-    async def update_channels(self):
+    def wakeup(self):
+        '''
+        Makes the clocks loop look at the clocks now instead of
+        waiting for the next one to change, after a clock is added
+        '''
+        self._wakeup.set()
+
+
+    def render(self, key:Tuple[str, str], now:datetime) -> Tuple[Optional[str], datetime]:
+        '''
+        Renders the (timezone, time_format), reusing the last text
+        until it can change
+
+        Returns:
+        --------
+        Tuple[Optional[str], datetime]
+            The text, None if the format is invalid, and when it can next change
+        '''
+        cached = self.rendered.get(key)
+        if cached is not None and cached[1] > now:
+            return cached
+        cached = self.rendered[key] = render(*key, now)
+        return cached
+
+
+    def add_clock(self, channel_id:int, timezone:str, fmt:str):
+        '''
+        Starts showing the time of timezone in the channel
+        '''
+        self.remove_clock(channel_id)
+        key = (timezone, fmt)
+        self.clocks[channel_id] = key
+        self.groups[key].add(channel_id)
+
+
+    def remove_clock(self, channel_id:int):
+        '''
+        Stops updating the clock of the channel, if it has one
+        '''
+        key = self.clocks.pop(channel_id, None)
+        self.retries.pop(channel_id, None)
+        if key is None:
+            return
+        group = self.groups[key]
+        group.discard(channel_id)
+        if not group:
+            del self.groups[key]
+            self.due.pop(key, None)
+
+
+    async def load_clocks(self):
+        '''
+        Reads the clocks of every channel from the config
+
+        The renames done before the cog was loaded count against the
+        rename budget, and only the clocks whose channel doesn't show
+        the current name are renamed, spread over STARTUP_SPREAD
+        '''
+        now = datetime.now(pytz.utc)
         channels = await self.db.all_channels()
-        for channel_id in channels:
-            channel = self.bot.get_channel(channel_id)
-            if channel is None:
+        for channel_id, data in channels.items():
+            if data["timezone"] is None:
                 continue
+            # clocks made before the TimeZone converter gave canonical
+            # names could have the timezone in any case
+            timezone = get_timezone_index().get(data["timezone"]) or data["timezone"]
+            self.add_clock(channel_id, timezone, data["time_format"])
+            if data["renamed_at"] is not None:
+                self.rename_budget.record(channel_id, now.timestamp() - data["renamed_at"])
 
-            time = channels[channel_id]["timezone"]
-            time = datetime.now(pytz.timezone(time))
-            fmt = channels[channel_id]["time_format"]
-            try:
-                time = time.strftime(fmt)
-                await channel.edit(name=time)
-            except:
+        guilds = await self.db.all_guilds()
+        for guild_id, data in guilds.items():
+            if data["board_message"] is None:
                 continue
+            self.boards[guild_id] = {
+                "channel_id": data["board_channel"],
+                "message_id": data["board_message"],
+                "rows": data["board_rows"]
+            }
+
+        outdated = []
+        for key, channel_ids in self.groups.items():
+            name, self.due[key] = self.render(key, now)
+            for channel_id in channel_ids:
+                channel = self.bot.get_channel(channel_id)
+                if channel is not None and name is not None and channel.name != name:
+                    outdated.append(channel_id)
+        for i, channel_id in enumerate(outdated):
+            delay = STARTUP_SPREAD * i / len(outdated)
+            self.retries[channel_id] = now + timedelta(seconds=delay)
+
+
+    def enqueue(self, guild_id:int, key:Tuple[str, int], job, cycle:Cycle):
+        '''
+        Queues an edit in the lane of the guild, unless it is already queued
+
+        Parameters:
+        -----------
+        guild_id: int
+            The guild the edit is done in
+        key: Tuple[str, int]
+            What is edited, ("clock", channel_id) or ("board", guild_id)
+        job
+            A coroutine function doing the edit
+        cycle: Cycle
+            The pass of the loop queueing it
+        '''
+        if key in self.queued:
+            return
+        self.queued.add(key)
+        cycle.jobs += 1
+        cycle.pending += 1
+        self.lanes[guild_id].append((key, job, cycle))
+        if guild_id not in self.lane_tasks:
+            self.lane_tasks[guild_id] = self.bot.loop.create_task(self.run_lane(guild_id))
+
+
+    async def run_lane(self, guild_id:int):
+        '''
+        Sends the queued edits of the guild one at a time
+        '''
+        lane = self.lanes[guild_id]
+        try:
+            while lane:
+                key, job, cycle = lane.popleft()
+                try:
+                    async with self.edit_slots:
+                        await job()
+                except Exception:
+                    log.exception("Updating the %s %s failed", *key)
+                finally:
+                    self.queued.discard(key)
+                    cycle.pending -= 1
+                    if not cycle.pending:
+                        self.last_cycle = (monotonic() - cycle.start, cycle.jobs)
+                        log.debug("A clock cycle of %s edits took %.2fs", cycle.jobs, self.last_cycle[0])
+        finally:
+            del self.lane_tasks[guild_id]
+            if not lane:
+                del self.lanes[guild_id]
+
+
+    async def update_clock(self, channel_id:int):
+        '''
+        Renames the clock channel if its name is outdated
+
+        The name is rendered when the edit is sent, not when it was queued
+        '''
+        channel = self.bot.get_channel(channel_id)
+        key = self.clocks.get(channel_id)
+        if channel is None or key is None:
+            return
+        now = datetime.now(pytz.utc)
+        name, _ = self.render(key, now)
+        if name is None or name == channel.name:
+            return
+
+        if not self.rename_budget.acquire(channel.id):
+            # try again as soon as the channel can be renamed
+            retry_after = self.rename_budget.retry_after(channel.id)
+            self.retries[channel.id] = now + timedelta(seconds=retry_after)
+            self.wakeup()
+            return
+        try:
+            await channel.edit(name=name)
+        except discord.HTTPException:
+            log.exception("Couldn't rename the clock in channel %s", channel.id)
+            return
+        await self.db.channel(channel).renamed_at.set(now.timestamp())
+
+
+    def board_embed(self, rows:List[List[str]], now:datetime, color) -> Tuple[discord.Embed, str, datetime]:
+        '''
+        Renders a world clock board
+
+        Returns:
+        --------
+        Tuple[discord.Embed, str, datetime]
+            The embed, its description and when it can next change
+        '''
+        lines = []
+        due = now + timedelta(seconds=MAX_RESOLUTION)
+        for timezone, fmt in rows:
+            text, row_due = self.render((timezone, fmt), now)
+            lines.append(f"**{timezone}** \N{EM DASH} {text or 'invalid format'}")
+            due = min(due, row_due)
+        # boards added to before their length was checked lose their last rows
+        text = ""
+        for index, line in enumerate(lines):
+            more = f"\n...and {len(lines) - index} more"
+            if len(text) + len(line) + 1 + len(more) > BOARD_MAX_LENGTH:
+                text += more
+                break
+            text += ("\n" if text else "") + line
+        text = text or "No timezones on this board yet!"
+        embed = discord.Embed(title="World Clock", description=text, color=color)
+        embed.set_footer(text="Last updated")
+        embed.timestamp = now
+        return embed, text, due
+
+
+    async def update_board(self, guild_id:int, now:datetime) -> Optional[datetime]:
+        '''
+        Edits the board of the guild if any of its rows changed
+
+        Returns:
+        --------
+        Optional[datetime]
+            When the board can next change, None if its message is gone
+        '''
+        board = self.boards[guild_id]
+        channel = self.bot.get_channel(board["channel_id"])
+        if channel is None:
+            return now + timedelta(seconds=MAX_RESOLUTION)
+        color = await self.bot.get_embed_color(channel)
+        embed, text, due = self.board_embed(board["rows"], now, color)
+        if text == self.board_text.get(guild_id):
+            return due
+        try:
+            await channel.get_partial_message(board["message_id"]).edit(embed=embed)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+        except discord.HTTPException:
+            log.exception("Couldn't update the board in channel %s", channel.id)
+        else:
+            self.board_text[guild_id] = text
+        return due
+
+
+    async def tick_board(self, guild_id:int):
+        '''
+        Updates the board of the guild and schedules its next update
+        '''
+        if guild_id not in self.boards:
+            return
+        due = await self.update_board(guild_id, datetime.now(pytz.utc))
+        if due is None:
+            # the message of the board was deleted
+            self.remove_board(guild_id)
+            await self.db.guild_from_id(guild_id).board_message.clear()
+            return
+        self.board_due[guild_id] = due
+        self.wakeup()
+
+
+    def remove_board(self, guild_id:int):
+        self.boards.pop(guild_id, None)
+        self.board_due.pop(guild_id, None)
+        self.board_text.pop(guild_id, None)
+
+
+    @tasks.loop(seconds=0)
+    async def update_channels(self):
+        # cleared before looking at the clocks so one created meanwhile
+        # still wakes the loop up again
+        self._wakeup.clear()
+        now = datetime.now(pytz.utc)
+        cycle = Cycle()
+        for key, channel_ids in self.groups.items():
+            due = self.due.get(key)
+            if due is None or due <= now:
+                targets = list(channel_ids)
+            else:
+                targets = [channel_id for channel_id in channel_ids
+                           if channel_id in self.retries and self.retries[channel_id] <= now]
+            if not targets:
+                continue
+
+            # a retry that has passed is dropped even if the channel can't be
+            # renamed now, a deadline left in the past would make the loop spin
+            for channel_id in targets:
+                self.retries.pop(channel_id, None)
+            name, self.due[key] = self.render(key, now)
+            if name is None:
+                continue
+            for channel_id in targets:
+                channel = self.bot.get_channel(channel_id)
+                if channel is None:
+                    continue
+                if name == channel.name:
+                    continue
+                retry_after = self.rename_budget.retry_after(channel_id)
+                if retry_after:
+                    # queueing it would only make it wait in the lane
+                    self.retries[channel_id] = now + timedelta(seconds=retry_after)
+                    continue
+                self.enqueue(channel.guild.id, ("clock", channel_id),
+                             partial(self.update_clock, channel_id), cycle)
+
+        for guild_id in self.boards:
+            due = self.board_due.get(guild_id)
+            if due is not None and due > now:
+                continue
+            # tick_board sets the real one once the board was updated
+            self.board_due[guild_id] = now + timedelta(seconds=MAX_RESOLUTION)
+            self.enqueue(guild_id, ("board", guild_id), partial(self.tick_board, guild_id), cycle)
+
+        # sleep until the next clock can change, or a new one is created
+        wake = min(itertools.chain(self.due.values(), self.retries.values(), self.board_due.values()),
+                   default=now + timedelta(seconds=MAX_RESOLUTION))
+        timeout = (wake - datetime.now(pytz.utc)).total_seconds()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
 
 
     @update_channels.before_loop
     async def before_update_channels(self):
         await self.bot.wait_until_ready()
+        await self.load_clocks()
+
+
+    async def forget_channels(self, channel_ids):
+        '''
+        Stops the clocks of the channels and clears their config
+        '''
+        channel_ids = list(channel_ids)
+        for channel_id in channel_ids:
+            self.remove_clock(channel_id)
+        await asyncio.gather(*(self.db.channel_from_id(channel_id).clear()
+                               for channel_id in channel_ids))
+
+
+    @tasks.loop(seconds=RECONCILE_INTERVAL)
+    async def reconcile_clocks(self):
+        # a channel is only forgotten after two passes in a row couldn't
+        # find it, so a cold cache doesn't lose clocks, and the channels of
+        # unavailable guilds aren't looked at until their guild is back
+        unavailable = {guild.id for guild in self.bot.guilds if guild.unavailable}
+        channels = await self.db.all_channels()
+        missing = set()
+        # channel_id: guild_id, of the clocks saved before their guild was stored
+        guild_ids = {}
+        for channel_id, data in channels.items():
+            channel = self.bot.get_channel(channel_id)
+            if channel is not None:
+                if data.get("guild_id") is None:
+                    guild_ids[channel_id] = channel.guild.id
+                continue
+            guild_id = data.get("guild_id")
+            # without its guild a clock could be in any unavailable guild
+            if guild_id in unavailable or (guild_id is None and unavailable):
+                continue
+            missing.add(channel_id)
+        orphaned = missing & self.missing
+        self.missing = missing - orphaned
+        if orphaned:
+            await self.forget_channels(orphaned)
+            log.info("Cleared the config of %s deleted clock channels", len(orphaned))
+        if guild_ids:
+            await asyncio.gather(*(self.db.channel_from_id(channel_id).guild_id.set(guild_id)
+                                   for channel_id, guild_id in guild_ids.items()))
+
+
+    @reconcile_clocks.before_loop
+    async def before_reconcile_clocks(self):
+        await self.bot.wait_until_ready()
+
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if channel.id in self.clocks:
+            await self.forget_channels([channel.id])
+        board = self.boards.get(channel.guild.id)
+        if board is not None and board["channel_id"] == channel.id:
+            self.remove_board(channel.guild.id)
+            await self.db.guild(channel.guild).board_message.clear()
+
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        await self.forget_channels(channel.id for channel in guild.channels
+                                   if channel.id in self.clocks)
+        if guild.id in self.boards:
+            self.remove_board(guild.id)
+            await self.db.guild(guild).board_message.clear()
 
 
     @commands.guild_only()
@@ -88,9 +823,9 @@ class Clock(commands.Cog):
         For timezone, check out: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones
         For format, check out: https://strftime.org. Default is "%A, %I:%M %p (%Z)"
         """
-        time = datetime.now(pytz.timezone(timezone))
+        time = datetime.now(get_timezone(timezone))
         try:
-            time = time.strftime(format)
+            time = time.strftime(format or channel_defaults["time_format"])
         except ValueError:
             return await ctx.send("That is an invalid format! "
                                   "Please only use variable from https://strftime.org")
@@ -99,14 +834,223 @@ class Clock(commands.Cog):
         except Exception as e:
             await ctx.send(e)
             return
-        await self.db.channel(channel).timezone.set(timezone)
-        if format:
-            await self.db.channel(channel).time_format.set(format)
-        await ctx.send(f"Successfully created a channel with **{timezone}** timezone"
-                       ". It should be resolved on next cycle(5 minutes)")
+        await self.save_clock(channel, timezone, format)
+        self.wakeup()
+        await ctx.send(f"Successfully created a channel with **{timezone}** timezone!")
+
+
+    async def save_clock(self, channel, timezone:str, fmt:Optional[str]):
+        '''
+        Stores a new clock in the config, in a single write, and starts updating it
+        '''
+        data = {"timezone": timezone, "guild_id": channel.guild.id}
+        if fmt:
+            data["time_format"] = fmt
+        await self.db.channel(channel).set(data)
+        self.add_clock(channel.id, timezone, fmt or channel_defaults["time_format"])
+
+
+    @clock.command(name="create-many")
+    @checks.admin_or_permissions(manage_guild=True)
+    async def create_many(self, ctx, category:Optional[discord.CategoryChannel]=None, *, timezones:str):
+        """
+        Create many clocks at once, optionally in a category
+
+        Separate the timezones with commas and put a format after a `|` to use it for all of them.
+        e.g. `[p]clock create-many UTC, America/New_York, Asia/Kolkata | %H:%M (%Z)`
+        For format, check out: https://strftime.org. Default is "%A, %I:%M %p (%Z)"
+        """
+        timezones, _, format = timezones.partition("|")
+        format = format.strip() or None
+        names = [name.strip() for name in timezones.split(",") if name.strip()]
+        if not names:
+            return await ctx.send("You need to give at least one timezone!")
+        if len(names) > CREATE_MAX:
+            return await ctx.send(f"You can't create more than {CREATE_MAX} clocks at once!")
+
+        index = get_timezone_index()
+        invalid = [name for name in names if index.get(name) is None]
+        if invalid:
+            lines = []
+            for name in invalid:
+                suggestions = index.suggest(name)
+                line = f"`{name}`"
+                if suggestions:
+                    line += f" (did you mean {', '.join(f'`{tz}`' for tz in suggestions)}?)"
+                lines.append(line)
+            return await ctx.send("Couldn't find these timezones: " + ", ".join(lines))
+
+        now = datetime.now(pytz.utc)
+        clocks = []
+        try:
+            for name in names:
+                timezone = index.get(name)
+                text = now.astimezone(get_timezone(timezone)).strftime(format or channel_defaults["time_format"])
+                clocks.append((timezone, text))
+        except ValueError:
+            return await ctx.send("That is an invalid format! "
+                                  "Please only use variable from https://strftime.org")
+
+        slots = asyncio.Semaphore(CREATE_CONCURRENCY)
+        async def create(name):
+            async with slots:
+                return await ctx.guild.create_voice_channel(name=name, category=category)
+
+        async with ctx.typing():
+            channels = await asyncio.gather(*(create(text) for _, text in clocks),
+                                            return_exceptions=True)
+            created = [(channel, timezone) for channel, (timezone, _) in zip(channels, clocks)
+                       if not isinstance(channel, Exception)]
+            await asyncio.gather(*(self.save_clock(channel, timezone, format)
+                                   for channel, timezone in created))
+        self.wakeup()
+
+        errors = {str(channel) for channel in channels if isinstance(channel, Exception)}
+        if not created:
+            return await ctx.send("Couldn't create any of the clocks: " + ", ".join(errors))
+        message = f"Successfully created {len(created)} clocks!"
+        if errors:
+            message += (f" {len(clocks) - len(created)} couldn't be created: "
+                        + ", ".join(errors))
+        await ctx.send(message)
+
+
+    @clock.group(name="board", autohelp=True)
+    @checks.admin_or_permissions(manage_guild=True)
+    async def clock_board(self, ctx):
+        """
+        A single message showing the time of many timezones, updated every minute
+        """
+        pass
+
+
+
+    async def refresh_board(self, guild):
+        '''
+        Reloads the board of the guild from the config and updates it now
+        '''
+        data = await self.db.guild(guild).all()
+        self.remove_board(guild.id)
+        if data["board_message"] is not None:
+            self.boards[guild.id] = {
+                "channel_id": data["board_channel"],
+                "message_id": data["board_message"],
+                "rows": data["board_rows"]
+            }
+        self.wakeup()
+
+
+    @clock_board.command(name="post")
+    async def board_post(self, ctx, channel:discord.TextChannel=None):
+        """
+        Post the board in the given channel, or this one
+
+        A board that was already posted is moved
+        """
+        channel = channel or ctx.channel
+        old = self.boards.get(ctx.guild.id)
+        rows = await self.db.guild(ctx.guild).board_rows()
+        embed, _, _ = self.board_embed(rows, datetime.now(pytz.utc), await ctx.embed_color())
+        try:
+            message = await channel.send(embed=embed)
+        except discord.Forbidden:
+            return await ctx.send("I can't send embeds in that channel!")
+        if old is not None:
+            old_channel = self.bot.get_channel(old["channel_id"])
+            if old_channel is not None:
+                try:
+                    await old_channel.get_partial_message(old["message_id"]).delete()
+                except discord.HTTPException:
+                    pass
+        await self.db.guild(ctx.guild).board_channel.set(channel.id)
+        await self.db.guild(ctx.guild).board_message.set(message.id)
+        await self.refresh_board(ctx.guild)
+        await ctx.tick()
+
+
+    @clock_board.command(name="add")
+    async def board_add(self, ctx, timezone:TimeZone, *, format=None):
+        """
+        Add a timezone to the board. Wrap tz in quotes if it has spaces inside of it.
+        For format, check out: https://strftime.org. Default is "%A, %I:%M %p (%Z)"
+        """
+        format = format or channel_defaults["time_format"]
+        if len(format) > BOARD_FORMAT_LENGTH:
+            return await ctx.send(f"The format can't be longer than {BOARD_FORMAT_LENGTH} characters!")
+        try:
+            datetime.now(get_timezone(timezone)).strftime(format)
+        except ValueError:
+            return await ctx.send("That is an invalid format! "
+                                  "Please only use variable from https://strftime.org")
+        async with self.db.guild(ctx.guild).board_rows() as rows:
+            if len(rows) >= BOARD_MAX_ROWS:
+                return await ctx.send(f"A board can't have more than {BOARD_MAX_ROWS} timezones!")
+            # the longest each row can render to, one per line
+            length = sum(len(f"**{row_timezone}** \N{EM DASH} ") + longest_render(row_timezone, row_format) + 1
+                         for row_timezone, row_format in rows + [[timezone, format]])
+            if length > BOARD_MAX_LENGTH:
+                return await ctx.send("The board would get too long with this timezone! "
+                                      "Remove a row or use a shorter format.")
+            rows.append([timezone, format])
+        await self.refresh_board(ctx.guild)
+        await ctx.send(f"Added **{timezone}** to the board!")
+
+
+    @clock_board.command(name="remove")
+    async def board_remove(self, ctx, row:int):
+        """
+        Remove a row of the board, counting from 1 at the top
+        """
+        async with self.db.guild(ctx.guild).board_rows() as rows:
+            if not 1 <= row <= len(rows):
+                return await ctx.send("The board doesn't have that row!")
+            timezone, _ = rows.pop(row - 1)
+        await self.refresh_board(ctx.guild)
+        await ctx.send(f"Removed **{timezone}** from the board!")
+
+
+    @clock_board.command(name="delete")
+    async def board_delete(self, ctx):
+        """
+        Delete the board and all of its rows
+        """
+        board = self.boards.get(ctx.guild.id)
+        if board is not None:
+            channel = self.bot.get_channel(board["channel_id"])
+            if channel is not None:
+                try:
+                    await channel.get_partial_message(board["message_id"]).delete()
+                except discord.HTTPException:
+                    pass
+        await self.db.guild(ctx.guild).clear()
+        self.remove_board(ctx.guild.id)
+        await ctx.tick()
+
+
+    @clock.command(hidden=True)
+    @commands.is_owner()
+    async def stats(self, ctx):
+        """
+        Show how long updating the clocks takes
+        """
+        queued = sum(len(lane) for lane in self.lanes.values())
+        text = (f"Clocks: {len(self.clocks)} in {len(self.groups)} groups\n"
+                f"Boards: {len(self.boards)}\n"
+                f"Queued edits: {queued} in {len(self.lane_tasks)} guilds\n"
+                f"Clocks waiting for renames: {len(self.retries)}\n")
+        if self.last_cycle is not None:
+            duration, jobs = self.last_cycle
+            text += f"Last cycle: {jobs} edits in {duration:.2f}s"
+        else:
+            text += "Last cycle: none yet"
+        await ctx.send(text)
 
 
     @clock.command(hidden=True)
     @commands.is_owner()
     async def clear_all(self, ctx):
         await self.db.clear_all()
+        for channel_id in list(self.clocks):
+            self.remove_clock(channel_id)
+        for guild_id in list(self.boards):
+            self.remove_board(guild_id)
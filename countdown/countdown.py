@@ -1,7 +1,18 @@
 
 # stdlib
+import io
+import re
+import csv
+import json
 import datetime
 import asyncio
+import bisect
+import heapq
+import logging
+import itertools
+from collections import Counter, defaultdict, deque
+from time import monotonic
+from typing import Dict, List, Set
 
 # discord.py
 import discord
@@ -10,9 +21,12 @@ from discord.ext.commands.errors import CommandInvokeError
 
 # Red-DiscordBot
 from redbot.core import Config, commands, checks
+from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 # Current Plugin
-from .time import human_timedelta, UserFriendlyTime
+from .time import human_timedelta, human_timedeltas, parse_cache, ShortTime, UserFriendlyTime
+
+log = logging.getLogger("red.countdown")
 
 __author__ = 'AXVin'
 __version__ = '1.2.0'
@@ -24,7 +38,8 @@ global_defaults = {
 
 guild_defaults = {
     "countdowns": [],
-    "datetime_formatting": None
+    "datetime_formatting": None,
+    "milestones": []
 }
 # countdowns: [{
 #     channel_id: int,      - where the countdown will be
@@ -32,17 +47,202 @@ guild_defaults = {
 #     author_id: int,       - who started this countdown
 #     title: str,            - what this countdown is for
 #     ending_message: str,  - the message on countdown end
-#     end_time: str        - when it will end, see below
+#     end_time: str,        - when it will end, see below
+#     mirrors: [{           - copies of the countdown in other channels
+#         channel_id: int,
+#         message_id: int
+#     }],
+#     milestones: List[int] - seconds before end_time at which a reminder is sent
 # }]
+# milestones: List[int]     - the milestones given to new countdowns
 
 # We will use datetime.timestamp() to store it and datetime.fromtimestamp() to retrieve
 
+# How many messages of a single countdown are edited at once
+MIRROR_CONCURRENCY = 5
+# Discord allows 5 message edits per 5 seconds in a channel
+CHANNEL_EDIT_RATE = 5
+CHANNEL_EDIT_PER = 5.0
+# Countdowns shown on each page of the list and find commands, and the
+# most characters a page has, well below the embed description limit
+COUNTDOWNS_PER_PAGE = 10
+COUNTDOWNS_PAGE_LENGTH = 2000
+# Characters of a title shown in those lists, the limit of embed titles
+LIST_TITLE_LENGTH = 256
+# How many countdown messages are sent at once while importing, and the
+# most countdowns a single file can create
+IMPORT_CONCURRENCY = 5
+IMPORT_MAX_ROWS = 100
+# The record fields that are exported and imported
+EXPORT_FIELDS = ("channel_id", "author_id", "title", "ending_message", "end_time", "milestones")
+# end_time is exported as seconds since it, in UTC, so files don't depend
+# on the timezone of the host the bot runs on
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+# Seconds a countdown is skipped for after its first failure,
+# doubled on every failure in a row up to BACKOFF_MAX
+BACKOFF_BASE = 5
+BACKOFF_MAX = 600
+
+STARTED_CONTENT = "\N{PARTY POPPER} New Countdown Started! \N{PARTY POPPER}"
+ENDED_CONTENT = ("\N{HEAVY EXCLAMATION MARK SYMBOL} Countdown Ended! "
+                 "\N{HEAVY EXCLAMATION MARK SYMBOL}")
+
 
 class CountdownAborted(Exception):
     pass
 
 
 
+class EditBudget:
+    """
+    Keeps track of the message edits done in each channel so a tick
+    never queues more edits than the channel ratelimit allows
+    """
+
+    def __init__(self, rate:int=CHANNEL_EDIT_RATE, per:float=CHANNEL_EDIT_PER):
+        self.rate = rate
+        self.per = per
+        self._edits: Dict[int, deque] = defaultdict(deque)
+
+
+    def acquire(self, channel_id:int) -> bool:
+        '''
+        Uses one edit from the channel's budget
+
+        Returns:
+        --------
+        bool
+            False if the channel has no edits left for now
+        '''
+        now = monotonic()
+        edits = self._edits[channel_id]
+        while edits and now - edits[0] >= self.per:
+            edits.popleft()
+        if len(edits) >= self.rate:
+            return False
+        edits.append(now)
+        return True
+
+
+
+def parse_countdown_file(filename: str, data: bytes) -> List[dict]:
+    '''
+    Parses a file made by `[p]countdown export`
+
+    Raises:
+    -------
+    ValueError
+        If the file isn't a valid JSON or CSV export
+    '''
+    text = data.decode('utf8')
+    if filename.lower().endswith('.csv'):
+        rows = list(csv.DictReader(io.StringIO(text)))
+        for row in rows:
+            row['milestones'] = (row.get('milestones') or '').split()
+    else:
+        rows = json.loads(text)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("expected a list of countdowns")
+    return rows
+
+
+
+async def fan_out(coros, *, limit:int=MIRROR_CONCURRENCY) -> list:
+    '''
+    Awaits the given coroutines with at most `limit` of them running at once
+
+    Returns:
+    --------
+    list
+        The results in the same order, exceptions are returned instead of raised
+    '''
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros),
+                                return_exceptions=True)
+
+
+
+def link_text(text: str) -> str:
+    '''
+    Escapes text for the [text](url) of a markdown link, shortened to
+    LIST_TITLE_LENGTH characters
+    '''
+    if len(text) > LIST_TITLE_LENGTH:
+        text = text[:LIST_TITLE_LENGTH - 1] + "\N{HORIZONTAL ELLIPSIS}"
+    return re.sub(r"([\[\]\\])", r"\\\1", text)
+
+
+
+def time_remaining(end_times: List[datetime.datetime], now: datetime.datetime) -> List[str]:
+    '''
+    The "Time Remaining" of every end time, all formatted against the same
+    now, seconds are only shown in the last minute
+
+    Returns:
+    --------
+    List[str]
+        The text of every end time, in the same order
+    '''
+    texts = [None] * len(end_times)
+    for ignore_seconds in (True, False):
+        indexes = [i for i, end_time in enumerate(end_times)
+                   if ((end_time - now).total_seconds() > 60) == ignore_seconds]
+        deltas = human_timedeltas([end_times[i] for i in indexes], source=now,
+                                  ignore_seconds=ignore_seconds)
+        for i, delta in zip(indexes, deltas):
+            texts[i] = delta
+    return texts
+
+
+
+class Milestone(commands.Converter):
+    """
+    A short duration like "1d", "1h" or "10m" before the end of a countdown,
+    converted to seconds
+    """
+
+    async def convert(self, ctx, argument):
+        now = ctx.message.created_at
+        seconds = int((ShortTime(argument, now=now).dt - now).total_seconds())
+        if seconds <= 0:
+            raise commands.BadArgument("Milestones must be before the end of the countdown.")
+        return seconds
+
+
+
+class MirrorChannel(commands.Converter):
+    """
+    A text channel in any server the bot is in.
+    Channels outside the current server must be given as a mention or ID
+    and the author must be able to manage messages there
+    """
+
+    async def convert(self, ctx, argument):
+        try:
+            return await commands.TextChannelConverter().convert(ctx, argument)
+        except commands.BadArgument:
+            pass
+
+        match = re.match(r'<#([0-9]{15,21})>$|([0-9]{15,21})$', argument)
+        channel = None
+        if match is not None:
+            channel = ctx.bot.get_channel(int(match.group(1) or match.group(2)))
+        if not isinstance(channel, discord.TextChannel):
+            raise commands.BadArgument(f'Channel "{argument}" not found.')
+
+        member = channel.guild.get_member(ctx.author.id)
+        if member is None or not channel.permissions_for(member).manage_messages:
+            raise commands.BadArgument("You need the Manage Messages permission in "
+                                       f"{channel} to mirror a countdown there.")
+        return channel
+
+
+
 class Countdown:
 
     def __init__(self,
@@ -54,7 +254,9 @@ class Countdown:
                  end_time: datetime.datetime,
                  message: discord.Message=None,
                  channel: discord.TextChannel=None,
-                 guild: discord.Guild=None):
+                 guild: discord.Guild=None,
+                 mirrors: List[discord.Message]=None,
+                 milestones: List[int]=None):
         self.bot = bot
         self.config = config
         self.message = message
@@ -68,15 +270,39 @@ class Countdown:
         self.title = title
         self.ending_message = ending_message
         self.end_time = end_time
+        self.mirrors = mirrors or []
+        self.milestones = sorted(set(milestones or []), reverse=True)
+        self.ended = False
+        # bumped whenever the milestones change so the old timers are ignored
+        self.timer_version = 0
+        # failures in a row and the monotonic time before which it is skipped
+        self.failures = 0
+        self.retry_at = 0.0
+        # ids of the channels the ending message was sent to
+        self._announced: Set[int] = set()
+        # message_id: the embed dict that message is currently showing
+        self._rendered: Dict[int, dict] = {}
+        for message in self.messages:
+            if message.embeds:
+                self._rendered[message.id] = message.embeds[0].to_dict()
 
 
     def __repr__(self):
         return (
             f"<Countdown title={self.title}, message={self.message!r}, "
-            f"author={self.author!r}, channel={self.channel!r}"
+            f"author={self.author!r}, channel={self.channel!r}, "
+            f"mirrors={len(self.mirrors)}"
         )
 
 
+    @property
+    def messages(self) -> List[discord.Message]:
+        '''The countdown message followed by all of its mirrors'''
+        if self.message is None:
+            return list(self.mirrors)
+        return [self.message, *self.mirrors]
+
+
     @classmethod
     async def create(cls, *,
                      bot,
@@ -87,6 +313,7 @@ class Countdown:
                      ending_message: str,
                      end_time: datetime.datetime,
                      guild:discord.Guild=None,
+                     milestones: List[int]=None,
                      update_config=True):
         '''
         Creates a countdown from the given information along with message
@@ -99,13 +326,14 @@ class Countdown:
                          guild=guild,
                          title=title,
                          ending_message=ending_message,
-                         end_time=end_time)
+                         end_time=end_time,
+                         milestones=milestones)
 
-        content = "\N{PARTY POPPER} New Countdown Started! \N{PARTY POPPER}"
         embed = await countdown.create_embed()
-        message = await channel.send(content=content,
+        message = await channel.send(content=STARTED_CONTENT,
                                      embed=embed)
         countdown.message = message
+        countdown._rendered[message.id] = embed.to_dict()
 
         if update_config:
             async with config.guild(guild).countdowns() as countdowns:
@@ -116,22 +344,47 @@ class Countdown:
 
     @classmethod
     async def convert(cls, ctx, arg):
-        arg = arg.replace("discord.com", "discordapp.com")
-        message = await commands.MessageConverter().convert(ctx, arg)
-        try:
-            countdown = [countdown for countdown in ctx.cog.running_countdowns if countdown.message.id == message.id][0]
-        except IndexError:
+        # jump urls, {channel ID}-{message ID} and message IDs all end with the message ID
+        match = re.search(r'([0-9]{15,21})/?$', arg)
+        countdown = ctx.cog.index.get(int(match.group(1))) if match else None
+        if countdown is None or countdown.guild != ctx.guild:
             raise commands.BadArgument("Couldn't find a running countdown on that message")
         return countdown
 
 
     @classmethod
     async def from_record(cls, bot: commands.Bot, config, record: dict):
+        '''
+        Loads a stored countdown
+
+        Returns:
+        --------
+        Optional[Countdown]
+            The countdown, None if its channel doesn't exist anymore
+
+        Raises:
+        -------
+        discord.errors.NotFound, discord.errors.Forbidden
+            If its message was deleted or can't be read anymore
+        '''
         channel = bot.get_channel(record['channel_id'])
+        if channel is None:
+            return None
         message = await channel.fetch_message(record['message_id'])
         guild = channel.guild
         author = bot.get_user(record['author_id'])
         end_time = datetime.datetime.fromtimestamp(record['end_time'])
+
+        mirrors = []
+        for mirror in record.get('mirrors', []):
+            mirror_channel = bot.get_channel(mirror['channel_id'])
+            if mirror_channel is None:
+                continue
+            try:
+                mirrors.append(await mirror_channel.fetch_message(mirror['message_id']))
+            except (discord.errors.NotFound, discord.errors.Forbidden):
+                continue
+
         return cls(bot=bot,
                    config=config,
                    message=message,
@@ -139,7 +392,9 @@ class Countdown:
                    author=author,
                    title=record['title'],
                    ending_message=record['ending_message'],
-                   end_time=end_time)
+                   end_time=end_time,
+                   mirrors=mirrors,
+                   milestones=record.get('milestones'))
 
 
     def to_record(self) -> dict:
@@ -149,10 +404,151 @@ class Countdown:
             "author_id": self.author.id,
             "title": self.title,
             "ending_message": self.ending_message,
-            "end_time": self.end_time.timestamp()
+            "end_time": self.end_time.timestamp(),
+            "mirrors": [
+                {"channel_id": message.channel.id, "message_id": message.id}
+                for message in self.mirrors
+            ],
+            "milestones": self.milestones
         }
 
-    async def create_embed(self, *, force_ended:bool=False) -> discord.Embed:
+
+    def timers(self, *, now: datetime.datetime) -> list:
+        '''
+        The deadlines of this countdown which are still in the future
+
+        Returns:
+        --------
+        List[Tuple[datetime.datetime, Optional[int]]]
+            (when, milestone) pairs, milestone is None for the end of the countdown
+        '''
+        timers = []
+        for milestone in self.milestones:
+            when = self.end_time - datetime.timedelta(seconds=milestone)
+            # skip the ones we missed, e.g. while the bot was offline
+            if when > now:
+                timers.append((when, milestone))
+        timers.append((self.end_time, None))
+        return timers
+
+
+    def back_off(self) -> float:
+        '''
+        Registers a failure of the countdown
+
+        Returns:
+        --------
+        float
+            The seconds until the countdown should be retried
+        '''
+        self.failures += 1
+        delay = min(BACKOFF_BASE * 2 ** (self.failures - 1), BACKOFF_MAX)
+        self.retry_at = monotonic() + delay
+        return delay
+
+
+    async def reach_milestone(self, milestone: int):
+        '''
+        Announces that the countdown is `milestone` seconds away from ending
+        '''
+        now = datetime.datetime.utcnow()
+        delta = human_timedelta(now + datetime.timedelta(seconds=milestone), source=now)
+        await self.channel.send(f"\N{ALARM CLOCK} **{self.title}** ends in {delta}!")
+
+
+    async def save(self):
+        '''
+        Replaces the stored record of this countdown with the current one
+        '''
+        record = self.to_record()
+        async with self.config.guild(self.guild).countdowns() as countdowns:
+            for i, stored in enumerate(countdowns):
+                if stored['message_id'] == record['message_id']:
+                    countdowns[i] = record
+                    break
+            else:
+                countdowns.append(record)
+
+
+    async def remove_record(self):
+        '''
+        Removes the stored record of this countdown
+        '''
+        async with self.config.guild(self.guild).countdowns() as countdowns:
+            countdowns[:] = [record for record in countdowns
+                             if record['message_id'] != self.message.id]
+
+
+    async def add_mirror(self, channel: discord.TextChannel) -> discord.Message:
+        '''
+        Sends a copy of the countdown to channel which is then
+        kept updated along with the countdown message
+        '''
+        embed = await self.create_embed()
+        message = await channel.send(content=STARTED_CONTENT, embed=embed)
+        self.mirrors.append(message)
+        self._rendered[message.id] = embed.to_dict()
+        await self.save()
+        return message
+
+
+    async def remove_mirrors(self, messages: List[discord.Message]):
+        '''
+        Stops updating the given mirror messages
+        '''
+        ids = {message.id for message in messages}
+        self.mirrors = [message for message in self.mirrors if message.id not in ids]
+        for message_id in ids:
+            self._rendered.pop(message_id, None)
+        await self.save()
+
+
+    async def update(self, *, budget: EditBudget, now:datetime.datetime=None, delta:str=None):
+        '''
+        Renders the embed once and edits every message that is showing an
+        outdated one, as long as its channel has edits left in the budget
+
+        Parameters:
+        -----------
+        budget: EditBudget
+            The per channel edit budget shared by all countdowns
+        now: datetime.datetime
+            The time the embed is rendered at, defaults to now
+        delta: str
+            The time remaining at now, if it was already formatted
+
+        Raises the error of the countdown message's edit, if any.
+        Mirrors that were deleted or can't be edited anymore are dropped
+        '''
+        embed = await self.create_embed(now=now, delta=delta)
+        data = embed.to_dict()
+        targets = [message for message in self.messages
+                   if self._rendered.get(message.id) != data
+                   and budget.acquire(message.channel.id)]
+        if not targets:
+            return
+
+        results = await fan_out(message.edit(content=STARTED_CONTENT, embed=embed)
+                                for message in targets)
+        dead = []
+        error = None
+        for message, result in zip(targets, results):
+            if isinstance(result, Exception):
+                if message is self.message:
+                    # raised once the mirrors are dealt with
+                    error = result
+                elif isinstance(result, (discord.errors.NotFound, discord.errors.Forbidden)):
+                    dead.append(message)
+                continue
+            self._rendered[message.id] = data
+
+        if dead:
+            await self.remove_mirrors(dead)
+        if error is not None:
+            raise error
+
+    async def create_embed(self, *, force_ended:bool=False,
+                           now:datetime.datetime=None, delta:str=None) -> discord.Embed:
         '''
         Creates an embed
 
@@ -160,13 +556,17 @@ class Countdown:
         -----------
         force_ended: bool
             If the countdown was forcefully ended
+        now: datetime.datetime
+            The time the embed is rendered at, defaults to now
+        delta: str
+            The time remaining at now, if it was already formatted
 
         Returns:
         --------
         discord.Embed
             The created Embed
         '''
-        now = datetime.datetime.utcnow()
+        now = now or datetime.datetime.utcnow()
         datetime_formatting = await self.config.guild(self.guild).datetime_formatting()
 
         embed = discord.Embed(title=self.title)
@@ -188,8 +588,8 @@ class Countdown:
                 embed.timestamp=self.end_time
                 embed.set_footer(text="Ends at")
             embed.add_field(name="\u200b", value="\u200b")
-            ignore_seconds = True if (self.end_time - now).total_seconds() > 60 else False
-            delta = human_timedelta(self.end_time, source=now, ignore_seconds=ignore_seconds)
+            if delta is None:
+                delta, = time_remaining([self.end_time], now)
             embed.add_field(name="Time Remaining:",
                             value=delta)
 
@@ -208,18 +608,94 @@ class Countdown:
             if the countdown was forcefully ended
         '''
         if update_config:
-            async with self.config.guild(self.guild).countdowns() as countdowns:
-                countdowns.remove(self.to_record())
+            await self.remove_record()
+
+        # ending can be retried, don't send the ending message to a channel twice
+        channels = []
+        for message in self.messages:
+            if message.channel.id not in self._announced and message.channel not in channels:
+                channels.append(message.channel)
+        results = await fan_out(channel.send(self.ending_message)
+                                for channel in channels)
+        error = None
+        for channel, result in zip(channels, results):
+            if not isinstance(result, Exception):
+                self._announced.add(channel.id)
+            elif channel == self.message.channel:
+                error = result
+        if error is not None:
+            raise error
 
-        now = datetime.datetime.utcnow()
+        embed = await self.create_embed(force_ended=force)
+        results = await fan_out(message.edit(content=ENDED_CONTENT, embed=embed)
+                                for message in self.messages)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        self.ended = True
 
-        message = await self.channel.send(self.ending_message)
 
-        embed = await self.create_embed(force_ended=force)
-        content = ("\N{HEAVY EXCLAMATION MARK SYMBOL} Countdown Ended! "
-                   "\N{HEAVY EXCLAMATION MARK SYMBOL}")
-        await self.message.edit(content=content,
-                                embed=embed)
+
+
+class CountdownIndex:
+    """
+    The running countdowns by their message ID and, sorted by end_time,
+    by their guild so looking them up never needs an API call
+    """
+
+    def __init__(self):
+        self._by_message: Dict[int, Countdown] = {}
+        # guild_id: [(end_time, message_id, countdown)]
+        self._by_guild: Dict[int, list] = defaultdict(list)
+
+
+    def __contains__(self, countdown: Countdown) -> bool:
+        return self._by_message.get(countdown.message.id) is countdown
+
+
+    def __len__(self) -> int:
+        return len(self._by_message)
+
+
+    def add(self, countdown: Countdown):
+        self._by_message[countdown.message.id] = countdown
+        entry = (countdown.end_time, countdown.message.id, countdown)
+        bisect.insort(self._by_guild[countdown.guild.id], entry)
+
+
+    def remove(self, countdown: Countdown):
+        if self._by_message.pop(countdown.message.id, None) is None:
+            return
+        entries = self._by_guild[countdown.guild.id]
+        entry = (countdown.end_time, countdown.message.id, countdown)
+        i = bisect.bisect_left(entries, entry)
+        if i < len(entries) and entries[i][2] is countdown:
+            del entries[i]
+        if not entries:
+            del self._by_guild[countdown.guild.id]
+
+
+    def get(self, message_id: int):
+        return self._by_message.get(message_id)
+
+
+    def guild(self, guild_id: int, *, channel_id:int=None) -> List[Countdown]:
+        '''
+        The countdowns of a guild, optionally only of one channel, sorted by end_time
+        '''
+        countdowns = [entry[2] for entry in self._by_guild.get(guild_id, [])]
+        if channel_id is not None:
+            countdowns = [countdown for countdown in countdowns
+                          if countdown.channel.id == channel_id]
+        return countdowns
+
+
+    def search(self, guild_id: int, text: str) -> List[Countdown]:
+        '''
+        The countdowns of a guild whose title contains text, sorted by end_time
+        '''
+        text = text.casefold()
+        return [countdown for countdown in self.guild(guild_id)
+                if text in countdown.title.casefold()]
 
 
 
@@ -234,6 +710,14 @@ class CountdownCog(BaseCog, name="Countdown"):
         self.db.register_guild(**guild_defaults)
         self.db.register_global(**global_defaults)
         self.running_countdowns: List[Countdown] = []
+        self.index = CountdownIndex()
+        self.edit_budget = EditBudget()
+        # heap of (when, seq, countdown, milestone, timer_version)
+        # ends and milestones of every countdown are popped from here when due
+        self._timers: list = []
+        self._timer_seq = itertools.count()
+        # guild_id: Counter of "NotFound", "HTTP 503", etc.
+        self.failures: Dict[int, Counter] = defaultdict(Counter)
         self.countdown_handler.start()
 
 
@@ -241,19 +725,131 @@ class CountdownCog(BaseCog, name="Countdown"):
         self.countdown_handler.stop()
 
 
+    def schedule(self, countdown: Countdown, *, only_milestones:bool=False):
+        '''
+        Registers the future deadlines of a countdown
+
+        Parameters:
+        -----------
+        only_milestones: bool
+            if the end of the countdown is already registered
+        '''
+        now = datetime.datetime.utcnow()
+        for when, milestone in countdown.timers(now=now):
+            if milestone is None and only_milestones:
+                continue
+            self.push_timer(when, countdown, milestone)
+
+
+    def push_timer(self, when: datetime.datetime, countdown: Countdown, milestone:int=None):
+        entry = (when, next(self._timer_seq), countdown, milestone, countdown.timer_version)
+        heapq.heappush(self._timers, entry)
+
+
+    def reschedule_milestones(self, countdown: Countdown):
+        '''
+        Drops the pending milestones of a countdown and registers the current ones
+        '''
+        countdown.timer_version += 1
+        self.schedule(countdown, only_milestones=True)
+
+
+    def start(self, countdown: Countdown):
+        '''
+        Starts handling the countdown
+        '''
+        self.running_countdowns.append(countdown)
+        self.index.add(countdown)
+        self.schedule(countdown)
+
+
+    def discard(self, countdown: Countdown):
+        '''
+        Stops handling the countdown, if it was running
+        '''
+        if countdown not in self.index:
+            return
+        self.index.remove(countdown)
+        self.running_countdowns.remove(countdown)
+
+
+    async def evict(self, countdown: Countdown):
+        '''
+        Drops a countdown whose message can't be reached anymore
+        '''
+        countdown.ended = True
+        self.discard(countdown)
+        try:
+            await countdown.remove_record()
+        except Exception:
+            log.exception("Couldn't remove the record of %r", countdown)
+
+
+    async def process(self, countdown: Countdown, coro, *, evict:bool=True) -> bool:
+        '''
+        Awaits a step of the countdown without letting its failure
+        affect any other countdown
+
+        Deleted or inaccessible countdowns are evicted, any other failure
+        makes the countdown back off exponentially
+
+        Parameters:
+        -----------
+        evict: bool
+            If a NotFound or Forbidden evicts the countdown. Steps that
+            don't touch the countdown message itself, like the milestone
+            announcements, pass False so they are only logged
+
+        Returns:
+        --------
+        bool
+            if the step succeeded
+        '''
+        try:
+            await coro
+        except (discord.errors.NotFound, discord.errors.Forbidden) as error:
+            self.failures[countdown.guild.id][f"HTTP {error.status}"] += 1
+            if not evict:
+                log.info("Step of %r failed: %s", countdown, error)
+                return False
+            log.info("Evicting %r: %s", countdown, error)
+            await self.evict(countdown)
+        except discord.errors.HTTPException as error:
+            self.failures[countdown.guild.id][f"HTTP {error.status}"] += 1
+            delay = countdown.back_off()
+            log.warning("Retrying %r in %s seconds: %s", countdown, delay, error)
+        except Exception as error:
+            self.failures[countdown.guild.id][type(error).__name__] += 1
+            delay = countdown.back_off()
+            log.exception("Retrying %r in %s seconds", countdown, delay)
+        else:
+            countdown.failures = 0
+            return True
+        return False
+
+
     @tasks.loop(seconds=5)
     async def countdown_handler(self):
         now = datetime.datetime.utcnow()
-        for countdown in self.running_countdowns:
-            embed = await countdown.create_embed()
-            if countdown.end_time <= now:
-                self.running_countdowns.remove(countdown)
-                await countdown.end()
-            else:
-                content = "\N{PARTY POPPER} New Countdown Started! \N{PARTY POPPER}"
-                if embed.to_dict() != countdown.message.embeds[0].to_dict():
-                    await countdown.message.edit(content=content, embed=embed)
-            
+        while self._timers and self._timers[0][0] <= now:
+            _, _, countdown, milestone, version = heapq.heappop(self._timers)
+            if countdown.ended or countdown not in self.index:
+                continue
+            if milestone is None:
+                if await self.process(countdown, countdown.end()):
+                    self.discard(countdown)
+                elif not countdown.ended:
+                    retry = now + datetime.timedelta(seconds=countdown.retry_at - monotonic())
+                    self.push_timer(retry, countdown)
+            elif version == countdown.timer_version:
+                await self.process(countdown, countdown.reach_milestone(milestone), evict=False)
+
+        tick = monotonic()
+        due = [countdown for countdown in self.running_countdowns
+               if countdown.end_time > now and countdown.retry_at <= tick]
+        deltas = time_remaining([countdown.end_time for countdown in due], now)
+        for countdown, delta in zip(due, deltas):
+            await self.process(countdown, countdown.update(budget=self.edit_budget, now=now, delta=delta))
 
 
     @countdown_handler.before_loop
@@ -264,27 +860,35 @@ class CountdownCog(BaseCog, name="Countdown"):
         now = datetime.datetime.utcnow()
 
         guilds = await self.db.all_guilds()
-        for guild in guilds:
-            countdowns = guilds[guild]["countdowns"]
-
-            if not countdowns:
+        for guild_id, data in guilds.items():
+            if not data["countdowns"]:
+                continue
+            guild = self.bot.get_guild(guild_id)
+            if guild is None or guild.unavailable:
+                # its channels can't be told apart from deleted ones now
+                log.warning("Not loading the countdowns of unavailable guild %s", guild_id)
                 continue
 
-            guild = self.bot.get_guild(guild)
-            for record in countdowns:
+            # every record is loaded on its own, a broken one is only skipped
+            gone = set()
+            for record in data["countdowns"]:
                 try:
                     countdown = await Countdown.from_record(self.bot, self.db, record)
-                except discord.errors.NotFound:
-                    async with self.db.guild(guild).countdowns() as countdowns:
-                        countdowns.remove(record)
+                except (discord.errors.NotFound, discord.errors.Forbidden):
+                    countdown = None
+                except Exception:
+                    log.exception("Couldn't load the countdown of message %s", record.get('message_id'))
                     continue
 
-                if now > countdown.end_time:
-                    async with self.db.guild(guild).countdowns() as countdowns:
-                        countdowns.remove(record)
+                if countdown is None or now > countdown.end_time:
+                    gone.add(record['message_id'])
                     continue
+                self.start(countdown)
 
-                self.running_countdowns.append(countdown)
+            if gone:
+                async with self.db.guild_from_id(guild_id).countdowns() as countdowns:
+                    countdowns[:] = [record for record in countdowns
+                                     if record['message_id'] not in gone]
 
 
 
@@ -340,6 +944,7 @@ Times are in UTC.'''
         # ones
         end_time = end_time.dt + datetime.timedelta(seconds=15)
 
+        milestones = await self.db.guild(ctx.guild).milestones()
 
         countdown = await Countdown.create(
             bot=self.bot,
@@ -348,10 +953,11 @@ Times are in UTC.'''
             channel=channel,
             title=title,
             ending_message=ending_message,
-            end_time=end_time
+            end_time=end_time,
+            milestones=milestones
         )
 
-        self.running_countdowns.append(countdown)
+        self.start(countdown)
 
         await ctx.send(f"Successfully created countdown in {channel.mention}!")
 
@@ -363,11 +969,236 @@ Times are in UTC.'''
         Pre-maturely ends a countdown. message can be a jump url to the countdown message
         """
         countdown = message
-        self.running_countdowns.remove(countdown)
+        self.discard(countdown)
         await countdown.end(force=True)
         await ctx.send("Ended that countdown!")
 
 
+    @countdown.command(name="export")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_export(self, ctx, file_format:str="json"):
+        """
+        Exports all countdowns of this server as a `json` or `csv` file
+        The file can be imported again with `[p]countdown import`
+        """
+        file_format = file_format.lower()
+        if file_format not in ("json", "csv"):
+            return await ctx.send("The format must be either `json` or `csv`!")
+
+        records = await self.db.guild(ctx.guild).countdowns()
+        if not records:
+            return await ctx.send("There are no countdowns to export!")
+
+        rows = [{field: record.get(field) for field in EXPORT_FIELDS} for record in records]
+        for row in rows:
+            # stored with the timezone of this host, see from_record
+            end_time = datetime.datetime.fromtimestamp(row['end_time'])
+            row['end_time'] = (end_time - UNIX_EPOCH).total_seconds()
+        if file_format == "json":
+            data = json.dumps(rows, indent=4)
+        else:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                row['milestones'] = ' '.join(str(milestone) for milestone in row['milestones'] or [])
+                writer.writerow(row)
+            data = buffer.getvalue()
+
+        file = discord.File(fp=io.BytesIO(data.encode('utf8')),
+                            filename=f"countdowns.{file_format}")
+        await ctx.send(f"Exported {len(rows):,d} countdowns!", file=file)
+
+
+    @countdown.command(name="import")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_import(self, ctx, channel:discord.TextChannel=None):
+        """
+        Creates countdowns from a file made by `[p]countdown export`, attach it to the command
+        Countdowns whose channel isn't in this server are created in channel, or here if not given
+        Countdowns that have already ended are skipped
+        """
+        if not ctx.message.attachments:
+            return await ctx.send("Attach the exported `json` or `csv` file to the command!")
+        attachment = ctx.message.attachments[0]
+        try:
+            rows = parse_countdown_file(attachment.filename, await attachment.read())
+        except (UnicodeDecodeError, ValueError, csv.Error) as e:
+            return await ctx.send(f"That file isn't a valid countdown export: {e}")
+        if len(rows) > IMPORT_MAX_ROWS:
+            return await ctx.send(f"That file has {len(rows):,d} countdowns, "
+                                  f"import at most {IMPORT_MAX_ROWS:,d} at a time!")
+
+        now = datetime.datetime.utcnow()
+        channel = channel or ctx.channel
+        pending = []
+        skipped = 0
+        for row in rows:
+            try:
+                title = str(row['title'])
+                ending_message = str(row['ending_message'])
+                end_time = UNIX_EPOCH + datetime.timedelta(seconds=float(row['end_time']))
+                milestones = [int(milestone) for milestone in row.get('milestones') or []]
+                channel_id = int(row.get('channel_id') or 0)
+                author_id = int(row.get('author_id') or 0)
+            except (KeyError, TypeError, ValueError, OverflowError, OSError):
+                skipped += 1
+                continue
+            if end_time <= now:
+                skipped += 1
+                continue
+
+            target = ctx.guild.get_channel(channel_id)
+            if not isinstance(target, discord.TextChannel):
+                target = channel
+            pending.append(Countdown.create(
+                bot=self.bot,
+                config=self.db,
+                author=self.bot.get_user(author_id) or ctx.author,
+                channel=target,
+                title=title,
+                ending_message=ending_message,
+                end_time=end_time,
+                milestones=milestones,
+                update_config=False
+            ))
+
+        async with ctx.typing():
+            results = await fan_out(pending, limit=IMPORT_CONCURRENCY)
+        countdowns = [result for result in results if isinstance(result, Countdown)]
+        failed = len(results) - len(countdowns)
+
+        if countdowns:
+            async with self.db.guild(ctx.guild).countdowns() as records:
+                records.extend(countdown.to_record() for countdown in countdowns)
+            for countdown in countdowns:
+                self.start(countdown)
+
+        msg = f"Imported {len(countdowns):,d} countdowns!"
+        if skipped:
+            msg += f"\nSkipped {skipped:,d} invalid or already ended countdowns."
+        if failed:
+            msg += f"\nCouldn't send the message of {failed:,d} countdowns."
+        await ctx.send(msg)
+
+
+    async def send_countdowns(self, ctx, countdowns: List[Countdown], *, title: str):
+        '''
+        Pages through the given countdowns
+        '''
+        now = datetime.datetime.utcnow()
+        embed_color = await ctx.embed_color()
+        pages = []
+        deltas = human_timedeltas([countdown.end_time for countdown in countdowns], source=now, accuracy=2)
+        lines = []
+        length = 0
+        for countdown, delta in zip(countdowns, deltas):
+            line = (f"[{link_text(countdown.title)}]({countdown.message.jump_url}) "
+                    f"in {countdown.channel.mention} - ends in {delta}")
+            # a page ends at COUNTDOWNS_PER_PAGE lines or before it gets too long
+            if lines and (len(lines) == COUNTDOWNS_PER_PAGE
+                          or length + len(line) + 1 > COUNTDOWNS_PAGE_LENGTH):
+                pages.append(discord.Embed(color=embed_color, title=title, description="\n".join(lines)))
+                lines = []
+                length = 0
+            lines.append(line)
+            length += len(line) + 1
+        if lines:
+            pages.append(discord.Embed(color=embed_color, title=title, description="\n".join(lines)))
+
+        if len(pages) > 1:
+            for i, page in enumerate(pages, start=1):
+                page.set_footer(text=f"Page {i}/{len(pages)} - {len(countdowns):,d} countdowns")
+            await menu(ctx, pages, DEFAULT_CONTROLS)
+        else:
+            await ctx.send(embed=pages[0])
+
+
+    @countdown.command(name="list")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_list(self, ctx, channel:discord.TextChannel=None):
+        """
+        Lists the running countdowns of this server, or only of channel, by when they end
+        """
+        channel_id = channel.id if channel else None
+        countdowns = self.index.guild(ctx.guild.id, channel_id=channel_id)
+        if not countdowns:
+            return await ctx.send("There are no running countdowns!")
+        await self.send_countdowns(ctx, countdowns, title="Running countdowns:")
+
+
+    @countdown.command(name="find")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_find(self, ctx, *, text:str):
+        """
+        Finds the running countdowns of this server whose title contains text
+        """
+        countdowns = self.index.search(ctx.guild.id, text)
+        if not countdowns:
+            return await ctx.send("Couldn't find any running countdown with that title!")
+        await self.send_countdowns(ctx, countdowns, title=f"Countdowns matching {text}:")
+
+
+    @countdown.command(name="milestones")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_milestones(self, ctx, message:Countdown, *milestones:Milestone):
+        """
+        Sets when reminders are sent in the channel of a running countdown
+        message can be a jump url to the countdown message
+        Milestones are durations before the end like `1d 1h 10m`, run without them to remove all
+        """
+        countdown = message
+        countdown.milestones = sorted(set(milestones), reverse=True)
+        await countdown.save()
+        self.reschedule_milestones(countdown)
+        if not milestones:
+            return await ctx.send("Removed all milestones of that countdown!")
+        now = datetime.datetime.utcnow()
+        deltas = human_timedeltas([now + datetime.timedelta(seconds=milestone)
+                                   for milestone in countdown.milestones], source=now)
+        await ctx.send(f"That countdown will send reminders when {', '.join(deltas)} are left!")
+
+
+    @countdown.command(name="mirror")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_mirror(self, ctx, message:Countdown, *channels:MirrorChannel):
+        """
+        Shows a running countdown in more channels. message can be a jump url to the countdown message
+        Channels from other servers can be given by their ID
+        """
+        countdown = message
+        if not channels:
+            return await ctx.send_help()
+        mirrored = {mirror.channel.id for mirror in countdown.mirrors}
+        mirrored.add(countdown.channel.id)
+        added = []
+        for channel in channels:
+            if channel.id in mirrored:
+                continue
+            await countdown.add_mirror(channel)
+            mirrored.add(channel.id)
+            added.append(channel.mention)
+        if not added:
+            return await ctx.send("That countdown is already shown in those channels!")
+        await ctx.send(f"Mirrored that countdown to {', '.join(added)}!")
+
+
+    @countdown.command(name="unmirror")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def countdown_unmirror(self, ctx, message:Countdown, *channels:MirrorChannel):
+        """
+        Stops updating a countdown in the given channels. message can be a jump url to the countdown message
+        The mirror messages are left as they are
+        """
+        countdown = message
+        ids = {channel.id for channel in channels}
+        mirrors = [mirror for mirror in countdown.mirrors if mirror.channel.id in ids]
+        if not mirrors:
+            return await ctx.send("That countdown isn't mirrored in those channels!")
+        await countdown.remove_mirrors(mirrors)
+        await ctx.send(f"Stopped updating {len(mirrors)} mirror(s) of that countdown!")
+
+
 
 
     @countdown.error
@@ -415,6 +1246,58 @@ Times are in UTC.'''
         await ctx.send(f"Set the new interval time to {seconds:,d} seconds!")
 
 
+    @countdownset.command(name="parsecache")
+    @checks.is_owner()
+    async def show_parse_cache(self, ctx):
+        """
+        Shows how often parsed times were reused from the cache
+        """
+        info = parse_cache.info()
+        total = info.hits + info.misses
+        rate = info.hits / total if total else 0
+        await ctx.send(f"Hits: {info.hits:,d}, Misses: {info.misses:,d} ({rate:.1%} hit rate)\n"
+                       f"Cached: {info.currsize:,d}/{info.maxsize:,d}")
+
+
+    @countdownset.command(name="failures")
+    @checks.is_owner()
+    async def show_failures(self, ctx, amount:int=10):
+        """
+        Shows the servers whose countdowns failed to update the most
+        since the cog was loaded
+        """
+        if not self.failures:
+            return await ctx.send("No countdown has failed yet!")
+        totals = sorted(self.failures.items(),
+                        key=lambda item: sum(item[1].values()),
+                        reverse=True)
+        lines = []
+        for guild_id, counter in totals[:amount]:
+            guild = self.bot.get_guild(guild_id)
+            errors = ', '.join(f"{error}: {count:,d}" for error, count in counter.most_common())
+            lines.append(f"**{guild or guild_id}** - {errors}")
+        await ctx.send(embed=discord.Embed(title="Countdown failures",
+                                           description="\n".join(lines)))
+
+
+    @countdownset.command(name="milestones")
+    @checks.mod_or_permissions(manage_guild=True)
+    async def set_milestones(self, ctx, *milestones:Milestone):
+        """
+        Sets the default milestones for new countdowns, e.g. `1d 1h 10m`
+        A reminder is sent in the countdown channel when that much time is left
+        Run without milestones to disable them
+        """
+        milestones = sorted(set(milestones), reverse=True)
+        await self.db.guild(ctx.guild).milestones.set(milestones)
+        if not milestones:
+            return await ctx.send("New countdowns won't have any milestones!")
+        now = datetime.datetime.utcnow()
+        deltas = human_timedeltas([now + datetime.timedelta(seconds=milestone)
+                                   for milestone in milestones], source=now)
+        await ctx.send(f"New countdowns will send reminders when {', '.join(deltas)} are left!")
+
+
     @countdownset.command(name="datetime")
     @checks.mod_or_permissions(manage_guild=True)
     async def set_datetime_format(self, ctx, *, formatting:str=None):
@@ -17,7 +17,7 @@ from discord.ext.commands.errors import CommandInvokeError
 from redbot.core import Config, commands, checks
 
 # Current Plugin
-from .time import human_timedelta, UserFriendlyTime
+from .time import human_timedeltas, parse_cache, UserFriendlyTime
 from .formats import human_join
 
 __author__ = 'AXVin'
@@ -59,6 +59,28 @@ class GiveawayAborted(Exception):
 
 
 
+def time_remaining(end_times:List[datetime.datetime], now:datetime.datetime) -> List[str]:
+    '''
+    The "Time Remaining" of every end time, all formatted against the same
+    now, seconds are only shown in the last minute
+
+    Returns:
+    --------
+    List[str]
+        The text of every end time, in the same order
+    '''
+    texts = [None] * len(end_times)
+    for ignore_seconds in (True, False):
+        indexes = [i for i, end_time in enumerate(end_times)
+                   if ((end_time - now).total_seconds() > 60) == ignore_seconds]
+        deltas = human_timedeltas([end_times[i] for i in indexes], source=now,
+                                  ignore_seconds=ignore_seconds)
+        for i, delta in zip(indexes, deltas):
+            texts[i] = delta
+    return texts
+
+
+
 class Giveaway:
 
     def __init__(self,
@@ -192,7 +214,9 @@ class Giveaway:
         }
 
     async def create_embed(self,
-                           winners:Union[discord.Attachment, List[discord.User]]=None):
+                           winners:Union[discord.Attachment, List[discord.User]]=None,
+                           now:datetime.datetime=None,
+                           delta:str=None):
         '''
         Creates an embed
 
@@ -201,6 +225,10 @@ class Giveaway:
         winners: Union[Attachment, List[discord.User]]
             The users who won the giveaway
             If provided, giveaway end embed will be generated
+        now: datetime.datetime
+            The time the embed is rendered at, defaults to now
+        delta: str
+            The time remaining at now, if it was already formatted
 
         Returns:
         --------
@@ -212,7 +240,7 @@ class Giveaway:
                         value=self.author.mention,
                         inline=True)
 
-        now = datetime.datetime.utcnow()
+        now = now or datetime.datetime.utcnow()
         datetime_formatting = await self.config.guild(self.guild).datetime_formatting()
 
         if winners is not None:
@@ -242,8 +270,8 @@ class Giveaway:
                 embed.timestamp=self.end_time
                 embed.set_footer(text=f"{self.winners} winners | Ends at")
 
-            ignore_seconds = True if (self.end_time - now).total_seconds() > 60 else False
-            delta = human_timedelta(self.end_time, source=now, ignore_seconds=ignore_seconds)
+            if delta is None:
+                delta, = time_remaining([self.end_time], now)
             embed.add_field(name="Time Remaining:",
                             value=delta,
                             inline=True)
@@ -352,8 +380,11 @@ class GiveawayCog(BaseCog, name="Giveaway"):
     @tasks.loop(seconds=5)
     async def giveaway_handler(self):
         now = datetime.datetime.utcnow()
+        # the time remaining of every running giveaway is formatted at once
+        running = list(self.running_giveaways)
+        deltas = time_remaining([giveaway.end_time for giveaway in running], now)
 
-        for giveaway in self.running_giveaways:
+        for giveaway, delta in zip(running, deltas):
             if giveaway.end_time <= now:
                 self.running_giveaways.remove(giveaway)
                 try:
@@ -362,7 +393,7 @@ class GiveawayCog(BaseCog, name="Giveaway"):
                     continue
             else:
                 content = "\N{PARTY POPPER} New Giveaway Started! \N{PARTY POPPER}"
-                embed = await giveaway.create_embed()
+                embed = await giveaway.create_embed(now=now, delta=delta)
                 if embed.to_dict() != giveaway.message.embeds[0].to_dict():
                     try:
                         await giveaway.message.edit(content=content,
@@ -882,6 +913,19 @@ Ending Message: {config['ending_message']}
         await ctx.send(f"Set the new interval time to {seconds:,d} seconds!")
 
 
+    @giveawayset.command(name="parsecache")
+    @checks.is_owner()
+    async def show_parse_cache(self, ctx):
+        """
+        Shows how often parsed times were reused from the cache
+        """
+        info = parse_cache.info()
+        total = info.hits + info.misses
+        rate = info.hits / total if total else 0
+        await ctx.send(f"Hits: {info.hits:,d}, Misses: {info.misses:,d} ({rate:.1%} hit rate)\n"
+                       f"Cached: {info.currsize:,d}/{info.maxsize:,d}")
+
+
     @giveawayset.command(name="file", aliases=['file_threshold'])
     @checks.is_owner()
     async def set_file(self, ctx, threshold:int=20):
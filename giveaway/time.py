@@ -24,12 +24,173 @@ DEALINGS IN THE SOFTWARE.
 
 
 import datetime
-import parsedatetime as pdt
-from dateutil.relativedelta import relativedelta
+from calendar import monthrange
 from .formats import plural, human_join
 from discord.ext import commands
+from collections import OrderedDict, namedtuple
+import threading
+import asyncio
 import re
 
+# parsedatetime and dateutil are imported where they are used, the first
+# parse pays for importing them instead of every load of the cog
+
+# parsedatetime runs in a thread pool so a long or adversarial argument
+# can't block the event loop, these are the limits it runs with
+MAX_PARSE_LENGTH = 256
+PARSE_TIMEOUT = 3.0
+PARSE_WORKERS = 2
+
+_executor = None
+_local = threading.local()
+
+def get_calendar():
+    """The parsedatetime Calendar of the current thread.
+
+    A Calendar keeps the context of the parse it is doing on itself,
+    so it can't be shared between the event loop and the parsing threads.
+    """
+    calendar = getattr(_local, 'calendar', None)
+    if calendar is None:
+        import parsedatetime as pdt
+        calendar = _local.calendar = pdt.Calendar(version=pdt.VERSION_CONTEXT_STYLE)
+    return calendar
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='time-parse')
+    return _executor
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+class ParseCache:
+    """A bounded LRU cache for parsedatetime results.
+
+    A result is stored either as an offset from the time it was parsed at,
+    or as an absolute datetime, so it can be re-anchored to a new ``now``.
+    Keys include the date the argument was parsed on, which keeps results
+    like "tomorrow 5pm" or "next friday" from going stale.
+
+    Working out which of the two a result is takes a second parse, so a
+    result is only stored the second time its key misses, most arguments
+    are only ever given once.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        # keys that missed once, bounded like the entries
+        self._seen = OrderedDict()
+        # entries are put from the parsing threads
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        """Returns the cached (dt, remaining) for now or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            dt = None if entry is None else _anchor(entry, now)
+            if dt is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return dt, entry[2]
+
+    def seen(self, key):
+        """Returns if key missed before, remembering it for the next miss if not."""
+        with self._lock:
+            if self._seen.pop(key, None) is not None:
+                return True
+            self._seen[key] = True
+            if len(self._seen) > self.maxsize:
+                self._seen.popitem(last=False)
+            return False
+
+    def put(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._seen.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+parse_cache = ParseCache()
+
+def _anchor(entry, now):
+    """Turns a cached (kind, value, remaining) entry back into a datetime for now."""
+    kind, value, remaining = entry
+    if kind == 'offset':
+        return now + value
+    if kind == 'second_offset':
+        return now.replace(microsecond=0) + value
+    return value
+
+def _normalize(parse, argument, now, dt, remaining):
+    """Works out if dt, the result of parse(argument, now), is an offset from now
+    or an absolute time by parsing again about a second away from now.
+
+    Returns the cache entry or None if the result can't be cached.
+    """
+    # the probe has different microseconds too, some phrases drop them
+    microsecond = (now.microsecond + 500000) % 1000000
+    probe = (now + datetime.timedelta(seconds=1)).replace(microsecond=microsecond)
+    if probe.date() != now.date():
+        probe = (now - datetime.timedelta(seconds=1)).replace(microsecond=microsecond)
+    try:
+        probe_dt, probe_remaining = parse(argument, probe)
+    except commands.BadArgument:
+        return None
+    if probe_remaining != remaining:
+        return None
+    if probe_dt - probe == dt - now:
+        return ('offset', dt - now, remaining)
+    if probe_dt - probe.replace(microsecond=0) == dt - now.replace(microsecond=0):
+        return ('second_offset', dt - now.replace(microsecond=0), remaining)
+    if probe_dt == dt:
+        return ('absolute', dt, remaining)
+    return None
+
+def _parse_and_cache(parse, key, argument, now):
+    """Returns parse(argument, now) and puts its result in the cache
+    if its key missed before.
+
+    Results that are only right for this exact now aren't cached, they
+    would never be hit again and only push out the reusable ones.
+    """
+    dt, remaining = parse(argument, now)
+    if not parse_cache.seen(key):
+        return dt, remaining
+    entry = _normalize(parse, argument, now, dt, remaining)
+    if entry is not None:
+        parse_cache.put(key, entry)
+    return dt, remaining
+
+async def parse_in_executor(parse, key, argument, now):
+    """Runs parse(argument, now) in the parsing threads with a timeout
+    and puts its result in the cache.
+    """
+    if len(argument) > MAX_PARSE_LENGTH:
+        raise commands.BadArgument(f'That time is too long, keep it under {MAX_PARSE_LENGTH} characters.')
+
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(_get_executor(), _parse_and_cache, parse, key, argument, now)
+    try:
+        return await asyncio.wait_for(future, timeout=PARSE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise commands.BadArgument('That took too long to understand, try e.g. "tomorrow" or "3 days".') from None
+
 class ShortTime:
     compiled = re.compile("""(?:(?P<years>[0-9])(?:years?|y))?             # e.g. 2y
                              (?:(?P<months>[0-9]{1,2})(?:months?|mo))?     # e.g. 2months
@@ -45,6 +206,8 @@ class ShortTime:
         if match is None or not match.group(0):
             raise commands.BadArgument('invalid time provided')
 
+        from dateutil.relativedelta import relativedelta
+
         data = { k: int(v) for k, v in match.groupdict(default=0).items() }
         now = now or datetime.datetime.utcnow()
         self.dt = now + relativedelta(**data)
@@ -53,12 +216,140 @@ class ShortTime:
     async def convert(cls, ctx, argument):
         return cls(argument, now=ctx.message.created_at)
 
-class HumanTime:
-    calendar = pdt.Calendar(version=pdt.VERSION_CONTEXT_STYLE)
+class FastTime:
+    """A hand written parser for the most common natural language times.
+
+    It understands "in 3 days", "2 hours", "tomorrow", "next friday 5pm" and
+    ISO dates like "2030-05-01 13:00", giving the same results parsedatetime
+    gives for them. The whole argument must be the time, anything else
+    returns None so the caller can fall back to parsedatetime.
+    """
+    # compiled on the first parse, see _compile
+    relative = next_weekday = iso = None
+
+    # units with a time have their microseconds dropped by parsedatetime,
+    # units with only a date keep the current time
+    time_units = {
+        'second': 1, 'seconds': 1, 'sec': 1, 'secs': 1,
+        'minute': 60, 'minutes': 60, 'min': 60, 'mins': 60,
+        'hour': 3600, 'hours': 3600, 'hr': 3600,
+    }
+    date_units = {
+        'day': 1, 'days': 1,
+        'week': 7, 'weeks': 7,
+    }
+    weekdays = {
+        'monday': 0, 'mon': 0,
+        'tuesday': 1, 'tue': 1, 'tues': 1,
+        'wednesday': 2, 'wed': 2,
+        'thursday': 3, 'thu': 3,
+        'friday': 4, 'fri': 4,
+        'saturday': 5, 'sat': 5,
+        'sunday': 6, 'sun': 6,
+    }
 
-    def __init__(self, argument, *, now=None):
+    @classmethod
+    def _compile(cls):
+        cls.relative = re.compile(r'(?:in +)?(?P<amount>[0-9]{1,5}|an?) +(?P<unit>[a-z]+)', re.IGNORECASE)
+        cls.next_weekday = re.compile(r'next +(?P<weekday>[a-z]+)'
+                                      r'(?: +(?:at +)?(?:(?P<hour12>[0-9]{1,2})(?::(?P<minute12>[0-9]{2}))? *(?P<meridian>am|pm)'
+                                      r'|(?P<hour>[0-9]{1,2}):(?P<minute>[0-9]{2})(?::(?P<second>[0-9]{2}))?))?',
+                                      re.IGNORECASE)
+        cls.iso = re.compile(r'(?P<year>[0-9]{4})-(?P<month>[0-9]{1,2})-(?P<day>[0-9]{1,2})'
+                             r'(?: +(?P<hour>[0-9]{1,2}):(?P<minute>[0-9]{2})(?::(?P<second>[0-9]{2}))?)?')
+
+    @classmethod
+    def parse(cls, argument, now):
+        if cls.iso is None:
+            cls._compile()
+
+        argument = argument.rstrip(' ')
+        lowered = argument.lower()
+        if lowered == 'tomorrow':
+            return now + datetime.timedelta(days=1)
+
+        match = cls.relative.fullmatch(argument)
+        if match is not None:
+            amount = match.group('amount')
+            amount = int(amount) if amount.isdigit() else 1
+            unit = match.group('unit').lower()
+            if unit in cls.time_units:
+                return now.replace(microsecond=0) + datetime.timedelta(seconds=amount * cls.time_units[unit])
+            if unit in cls.date_units:
+                return now + datetime.timedelta(days=amount * cls.date_units[unit])
+            return None
+
+        match = cls.next_weekday.fullmatch(argument)
+        if match is not None:
+            weekday = cls.weekdays.get(match.group('weekday').lower())
+            if weekday is None:
+                return None
+            date = now.date() + datetime.timedelta(days=7 - now.weekday() + weekday)
+            time = cls._time(match)
+            if time is False:
+                return None
+            if time is None:
+                return datetime.datetime.combine(date, now.time())
+            return datetime.datetime.combine(date, time)
+
+        match = cls.iso.fullmatch(argument)
+        if match is not None:
+            try:
+                date = datetime.date(int(match.group('year')), int(match.group('month')), int(match.group('day')))
+            except ValueError:
+                return None
+            time = cls._time(match)
+            if time is False:
+                return None
+            if time is None:
+                return datetime.datetime.combine(date, now.time())
+            return datetime.datetime.combine(date, time)
+
+        return None
+
+    @staticmethod
+    def _time(match):
+        """The time of a match, None if it has none or False if it is invalid."""
+        groups = match.groupdict()
+        if groups.get('meridian'):
+            hour = int(groups['hour12'])
+            minute = int(groups['minute12'] or 0)
+            if not 1 <= hour <= 12 or minute > 59:
+                return False
+            hour = hour % 12 + (12 if groups['meridian'].lower() == 'pm' else 0)
+            return datetime.time(hour, minute)
+        if groups.get('hour'):
+            hour, minute = int(groups['hour']), int(groups['minute'])
+            second = int(groups['second'] or 0)
+            if hour > 23 or minute > 59 or second > 59:
+                return False
+            return datetime.time(hour, minute, second)
+        return None
+
+class HumanTime:
+    def __init__(self, argument, *, now=None, parsed=None):
+        # parsed is the (dt, remaining) convert already got for argument at now
         now = now or datetime.datetime.utcnow()
-        dt, status = self.calendar.parseDT(argument, sourceTime=now)
+        if parsed is not None:
+            dt, _ = parsed
+        else:
+            key = ('human', argument, now.date())
+            cached = parse_cache.get(key, now)
+            if cached is not None:
+                dt, _ = cached
+            else:
+                dt, _ = _parse_and_cache(self.parse, key, argument, now)
+
+        self.dt = dt
+        self._past = dt < now
+
+    @classmethod
+    def parse(cls, argument, now):
+        dt = FastTime.parse(argument, now)
+        if dt is not None:
+            return dt, None
+
+        dt, status = get_calendar().parseDT(argument, sourceTime=now)
         if not status.hasDateOrTime:
             raise commands.BadArgument('invalid time provided, try e.g. "tomorrow" or "3 days"')
 
@@ -66,26 +357,44 @@ class HumanTime:
             # replace it with the current time
             dt = dt.replace(hour=now.hour, minute=now.minute, second=now.second, microsecond=now.microsecond)
 
-        self.dt = dt
-        self._past = dt < now
+        return dt, None
 
     @classmethod
     async def convert(cls, ctx, argument):
-        return cls(argument, now=ctx.message.created_at)
+        now = ctx.message.created_at
+        dt = FastTime.parse(argument, now)
+        if dt is not None:
+            parsed = dt, None
+        else:
+            # parse it off the event loop and hand the result to the instance
+            key = ('human', argument, now.date())
+            parsed = parse_cache.get(key, now)
+            if parsed is None:
+                parsed = await parse_in_executor(cls.parse, key, argument, now)
+        return cls(argument, now=now, parsed=parsed)
 
 class Time(HumanTime):
-    def __init__(self, argument, *, now=None):
+    def __init__(self, argument, *, now=None, parsed=None):
         try:
             o = ShortTime(argument, now=now)
         except Exception as e:
-            super().__init__(argument)
+            super().__init__(argument, now=now, parsed=parsed)
         else:
             self.dt = o.dt
             self._past = False
 
+    @classmethod
+    async def convert(cls, ctx, argument):
+        # short times like "2h30m" are parsed right here, only the rest
+        # goes through HumanTime.convert and the parsing threads
+        match = ShortTime.compiled.fullmatch(argument)
+        if match is not None and match.group(0):
+            return cls(argument, now=ctx.message.created_at)
+        return await super().convert(ctx, argument)
+
 class FutureTime(Time):
-    def __init__(self, argument, *, now=None):
-        super().__init__(argument, now=now)
+    def __init__(self, argument, *, now=None, parsed=None):
+        super().__init__(argument, now=now, parsed=parsed)
 
         if self._past:
             raise commands.BadArgument('this time is in the past')
@@ -119,114 +428,159 @@ class UserFriendlyTime(commands.Converter):
 
     async def convert(self, ctx, argument):
         try:
-            calendar = HumanTime.calendar
             regex = ShortTime.compiled
             now = ctx.message.created_at
 
             match = regex.match(argument)
             if match is not None and match.group(0):
+                from dateutil.relativedelta import relativedelta
+
                 data = { k: int(v) for k, v in match.groupdict(default=0).items() }
                 remaining = argument[match.end():].strip()
                 self.dt = now + relativedelta(**data)
                 return await self.check_constraints(ctx, now, remaining)
 
+            dt = FastTime.parse(self.clean(argument), now)
+            if dt is not None:
+                self.dt = dt
+                return await self.check_constraints(ctx, now, '')
 
-            # apparently nlp does not like "from now"
-            # it likes "from x" in other cases though so let me handle the 'now' case
-            if argument.endswith('from now'):
-                argument = argument[:-8].strip()
-
-            if argument[0:2] == 'me':
-                # starts with "me to", "me in", or "me at "
-                if argument[0:6] in ('me to ', 'me in ', 'me at '):
-                    argument = argument[6:]
+            key = ('friendly', argument, now.date())
+            cached = parse_cache.get(key, now)
+            if cached is None:
+                cached = await parse_in_executor(self.parse, key, argument, now)
+            self.dt, remaining = cached
+            return await self.check_constraints(ctx, now, remaining)
+        except:
+            import traceback
+            traceback.print_exc()
+            raise
 
-            elements = calendar.nlp(argument, sourceTime=now)
-            if elements is None or len(elements) == 0:
-                raise commands.BadArgument('Invalid time provided, try e.g. "tomorrow" or "3 days".')
+    @staticmethod
+    def clean(argument):
+        """Strips the parts of argument parsedatetime doesn't understand."""
+        # apparently nlp does not like "from now"
+        # it likes "from x" in other cases though so let me handle the 'now' case
+        if argument.endswith('from now'):
+            argument = argument[:-8].strip()
 
-            # handle the following cases:
-            # "date time" foo
-            # date time foo
-            # foo date time
+        if argument[0:2] == 'me':
+            # starts with "me to", "me in", or "me at "
+            if argument[0:6] in ('me to ', 'me in ', 'me at '):
+                argument = argument[6:]
+        return argument
 
-            # first the first two cases:
-            dt, status, begin, end, dt_string = elements[0]
+    @classmethod
+    def parse(cls, argument, now):
+        """Parses the natural language time in argument with parsedatetime.
 
-            if not status.hasDateOrTime:
-                raise commands.BadArgument('Invalid time provided, try e.g. "tomorrow" or "3 days".')
+        Returns a tuple of the datetime and the text remaining around it.
+        """
+        import parsedatetime as pdt
 
-            if begin not in (0, 1) and end != len(argument):
-                raise commands.BadArgument('Time is either in an inappropriate location, which ' \
-                                           'must be either at the end or beginning of your input, ' \
-                                           'or I just flat out did not understand what you meant. Sorry.')
+        calendar = get_calendar()
+        argument = cls.clean(argument)
 
-            if not status.hasTime:
-                # replace it with the current time
-                dt = dt.replace(hour=now.hour, minute=now.minute, second=now.second, microsecond=now.microsecond)
+        dt = FastTime.parse(argument, now)
+        if dt is not None:
+            return dt, ''
 
-            # if midnight is provided, just default to next day
-            if status.accuracy == pdt.pdtContext.ACU_HALFDAY:
-                dt = dt.replace(day=now.day + 1)
+        elements = calendar.nlp(argument, sourceTime=now)
+        if elements is None or len(elements) == 0:
+            raise commands.BadArgument('Invalid time provided, try e.g. "tomorrow" or "3 days".')
 
-            self.dt =  dt
+        # handle the following cases:
+        # "date time" foo
+        # date time foo
+        # foo date time
 
-            if begin in (0, 1):
-                if begin == 1:
-                    # check if it's quoted:
-                    if argument[0] != '"':
-                        raise commands.BadArgument('Expected quote before time input...')
+        # first the first two cases:
+        dt, status, begin, end, dt_string = elements[0]
 
-                    if not (end < len(argument) and argument[end] == '"'):
-                        raise commands.BadArgument('If the time is quoted, you must unquote it.')
+        if not status.hasDateOrTime:
+            raise commands.BadArgument('Invalid time provided, try e.g. "tomorrow" or "3 days".')
 
-                    remaining = argument[end + 1:].lstrip(' ,.!')
-                else:
-                    remaining = argument[end:].lstrip(' ,.!')
-            elif len(argument) == end:
-                remaining = argument[:begin].strip()
+        if begin not in (0, 1) and end != len(argument):
+            raise commands.BadArgument('Time is either in an inappropriate location, which ' \
+                                       'must be either at the end or beginning of your input, ' \
+                                       'or I just flat out did not understand what you meant. Sorry.')
 
-            return await self.check_constraints(ctx, now, remaining)
-        except:
-            import traceback
-            traceback.print_exc()
-            raise
+        if not status.hasTime:
+            # replace it with the current time
+            dt = dt.replace(hour=now.hour, minute=now.minute, second=now.second, microsecond=now.microsecond)
 
-def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True, ignore_seconds=False):
-    now = source or datetime.datetime.utcnow()
-    # Microsecond free zone
-    now = now.replace(microsecond=0)
-    dt = dt.replace(microsecond=0)
+        # if midnight is provided, just default to next day
+        if status.accuracy == pdt.pdtContext.ACU_HALFDAY:
+            dt = dt.replace(day=now.day + 1)
+
+        if begin in (0, 1):
+            if begin == 1:
+                # check if it's quoted:
+                if argument[0] != '"':
+                    raise commands.BadArgument('Expected quote before time input...')
+
+                if not (end < len(argument) and argument[end] == '"'):
+                    raise commands.BadArgument('If the time is quoted, you must unquote it.')
+
+                remaining = argument[end + 1:].lstrip(' ,.!')
+            else:
+                remaining = argument[end:].lstrip(' ,.!')
+        elif len(argument) == end:
+            remaining = argument[:begin].strip()
+
+        return dt, remaining
+
+def _next_month(dt):
+    # The same as dt + relativedelta(months=1), the day is clipped to the
+    # length of the next month
+    year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+    return dt.replace(year=year, month=month, day=min(dt.day, monthrange(year, month)[1]))
+
+def _delta_parts(dt, now):
+    # Returns (years, months, days, hours, minutes, seconds) between the two
+    # microsecond free datetimes, the same fields relativedelta gives.
+    # Spans under a calendar month need no calendar, so plain divmod on the
+    # seconds is exact for them and relativedelta is only used above that.
+    earlier, later = (now, dt) if dt > now else (dt, now)
+    span = later - earlier
+    if span.days < 28 or later < _next_month(earlier):
+        minutes, seconds = divmod(span.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return 0, 0, span.days, hours, minutes, seconds
+
+    from dateutil.relativedelta import relativedelta
 
     # This implementation uses relativedelta instead of the much more obvious
     # divmod approach with seconds because the seconds approach is not entirely
     # accurate once you go over 1 week in terms of accuracy since you have to
     # hardcode a month as 30 or 31 days.
     # A query like "11 months" can be interpreted as "!1 months and 6 days"
+    delta = relativedelta(later, earlier)
+    return delta.years, delta.months, delta.days, delta.hours, delta.minutes, delta.seconds
+
+_attrs = [
+    ('year', 'y'),
+    ('month', 'mo'),
+    ('day', 'd'),
+    ('hour', 'h'),
+    ('minute', 'm'),
+    ('second', 's'),
+]
+
+def _format_delta(dt, now, accuracy, brief, suffix, ignore_seconds):
+    dt = dt.replace(microsecond=0)
     if dt > now:
-        delta = relativedelta(dt, now)
         suffix = ''
     else:
-        delta = relativedelta(now, dt)
         suffix = ' ago' if suffix else ''
 
-    attrs = [
-        ('year', 'y'),
-        ('month', 'mo'),
-        ('day', 'd'),
-        ('hour', 'h'),
-        ('minute', 'm'),
-        ('second', 's'),
-    ]
-
     output = []
-    for attr, brief_attr in attrs:
-        elem = getattr(delta, attr + 's')
+    for (attr, brief_attr), elem in zip(_attrs, _delta_parts(dt, now)):
         if not elem:
             continue
 
         if attr == 'day':
-            weeks = delta.weeks
+            weeks = elem // 7
             if weeks:
                 elem -= weeks * 7
                 if not brief:
@@ -254,3 +608,20 @@ def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True, ig
             return human_join(output, final='and') + suffix
         else:
             return ' '.join(output) + suffix
+
+def human_timedelta(dt, *, source=None, accuracy=3, brief=False, suffix=True, ignore_seconds=False):
+    now = source or datetime.datetime.utcnow()
+    # Microsecond free zone
+    now = now.replace(microsecond=0)
+    return _format_delta(dt, now, accuracy, brief, suffix, ignore_seconds)
+
+def human_timedeltas(dts, *, source=None, accuracy=3, brief=False, suffix=True, ignore_seconds=False):
+    """Formats many datetimes against the same source at once.
+
+    Takes the same keyword arguments as human_timedelta and returns the
+    strings it would give for each of the datetimes, in the same order.
+    """
+    now = source or datetime.datetime.utcnow()
+    # Microsecond free zone
+    now = now.replace(microsecond=0)
+    return [_format_delta(dt, now, accuracy, brief, suffix, ignore_seconds) for dt in dts]
@@ -0,0 +1,246 @@
+# stdlib
+import random
+import asyncio
+import logging
+from time import monotonic
+from typing import Optional
+
+# discord.py
+import aiohttp
+
+
+log = logging.getLogger("red.watch2gether.api")
+
+BASE_URL = "https://w2g.tv"
+
+# Seconds a single attempt of a request, and connecting for it, may take
+REQUEST_TIMEOUT = 10.0
+CONNECT_TIMEOUT = 3.0
+# Connections kept open to w2g.tv and in total
+CONNECTION_LIMIT = 20
+# Retries of a request failing with a 5xx, a 429 or a connection error,
+# waiting a random time up to BACKOFF_BASE doubled on every retry
+RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+# Requests failing in a row before w2g.tv is assumed down and no request
+# is sent for BREAKER_RESET seconds
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+
+
+class W2GError(Exception):
+    """
+    A request to the Watch2Gether API failed, the message can be shown to users
+    """
+    pass
+
+
+
+class W2GUnavailable(W2GError):
+    """
+    Watch2Gether didn't answer, answered with server errors or the
+    circuit breaker is open
+    """
+    pass
+
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a service that keeps failing
+
+    After threshold failures in a row the breaker opens and every request
+    is refused for reset seconds. Then a single request is let through,
+    its success closes the breaker again and its failure reopens it.
+    """
+
+    def __init__(self, threshold:int=BREAKER_THRESHOLD, reset:float=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or monotonic() - self.opened_at >= self.reset:
+            return "half-open"
+        return "open"
+
+
+    def allow(self) -> bool:
+        '''
+        Whether a request can be sent now
+        '''
+        if self.opened_at is None:
+            return True
+        if self._trial or monotonic() - self.opened_at < self.reset:
+            return False
+        self._trial = True
+        return True
+
+
+    def release(self):
+        '''
+        Lets another trial request through after the trial request ended
+        without a result, e.g. because it was cancelled
+        '''
+        self._trial = False
+
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+
+    def failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.threshold:
+            if self.opened_at is None or self._trial:
+                log.warning("Watch2Gether keeps failing, not sending requests for %ss", self.reset)
+            self.opened_at = monotonic()
+            self._trial = False
+
+
+
+class W2GClient:
+    """
+    A pooled client for the Watch2Gether API with timeouts, retries and
+    a circuit breaker
+    """
+
+    def __init__(self, *, base_url:str=BASE_URL, retries:int=RETRIES,
+                 backoff:float=BACKOFF_BASE, max_backoff:float=BACKOFF_MAX,
+                 timeout:float=REQUEST_TIMEOUT, connect_timeout:float=CONNECT_TIMEOUT,
+                 limit:int=CONNECTION_LIMIT, breaker:CircuitBreaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.limit = limit
+        self.breaker = breaker or CircuitBreaker()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # made on first use so it is made inside of the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+    def delay(self, attempt:int, retry_after:Optional[str]=None) -> float:
+        '''
+        Seconds to wait before the given retry, the Retry-After of a 429
+        if it has one and a jittered exponential backoff otherwise
+        '''
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+    async def request(self, method:str, path:str, **kwargs) -> dict:
+        '''
+        Sends a request to the API
+
+        Returns:
+        --------
+        dict
+            The JSON the API answered with
+
+        Raises:
+        -------
+        W2GUnavailable
+            If the API couldn't be reached or kept failing
+        W2GError
+            If the API refused the request
+        '''
+        if not self.breaker.allow():
+            raise W2GUnavailable("Watch2Gether isn't responding right now, try again in a bit!")
+
+        # a request let through by an opened breaker is its trial request
+        trial = self.breaker.opened_at is not None
+        try:
+            return await self._request(method, path, **kwargs)
+        finally:
+            # success() and failure() already end the trial, this only does
+            # anything when the request was cancelled or raised unexpectedly
+            if trial:
+                self.breaker.release()
+
+
+    async def _request(self, method:str, path:str, **kwargs) -> dict:
+        url = self.base_url + path
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                async with self.session.request(method, url, **kwargs) as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        retry_after = resp.headers.get("Retry-After")
+                        log.debug("Watch2Gether answered %s %s with %s", method, path, resp.status)
+                    elif resp.status >= 400:
+                        # the service works, the request is wrong (e.g. the api key)
+                        self.breaker.success()
+                        raise W2GError(f"Watch2Gether refused the request (HTTP {resp.status}). "
+                                       "Is the API key right?")
+                    else:
+                        try:
+                            data = await resp.json(content_type=None)
+                        except ValueError:
+                            data = None
+                        if not isinstance(data, dict):
+                            self.breaker.failure()
+                            raise W2GUnavailable("Watch2Gether sent an invalid answer, try again in a bit!")
+                        self.breaker.success()
+                        return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.debug("Requesting %s %s failed: %r", method, path, e)
+
+            if attempt < self.retries:
+                await asyncio.sleep(self.delay(attempt, retry_after))
+
+        self.breaker.failure()
+        raise W2GUnavailable("Watch2Gether isn't responding right now, try again in a bit!")
+
+
+    async def create_room(self, api_key:str, share:Optional[str]=None) -> str:
+        '''
+        Creates a room
+
+        Parameters:
+        -----------
+        api_key: str
+            The Watch2Gether API key
+        share: Optional[str]
+            The link of what the room plays first
+
+        Returns:
+        --------
+        str
+            The stream key of the room
+        '''
+        data = {"w2g_api_key": api_key}
+        if share is not None:
+            data["share"] = share
+        jsondata = await self.request("POST", "/rooms/create.json", data=data)
+        room_key = jsondata.get("streamkey")
+        if not isinstance(room_key, str):
+            raise W2GError("Watch2Gether didn't create the room, try again in a bit!")
+        return room_key
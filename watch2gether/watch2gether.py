@@ -1,41 +1,269 @@
 
 # stdlib
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import bisect
+import time
 
 # discord.py
-import aiohttp
 import discord
 import logging
 from discord.ext import tasks
 
 # Red-DiscordBot
 from redbot.core import Config, commands
-from redbot.core.utils.predicates import ReactionPredicate
-from redbot.core.utils.menus import start_adding_reactions
+from redbot.core.utils.menus import menu, close_menu, next_page, prev_page
 
 # Current Plugin
-from .time import human_timedelta
+from .api import W2GClient, W2GError
 
-# log = logging.getLogger("red.watch2gether")
+log = logging.getLogger("red.watch2gether")
 
 __author__ = 'AXVin'
-__version__ = '1.1.2'
+__version__ = '1.5.0'
 
 
 
 guild_defaults = {
     "expires": 43200,
-    "rooms": []
+    "link_ttl": 300,
+    "rooms": [],
+    "pool_size": 0,
+    "pool_concurrency": 2,
+    "pool": []
 }
 
 # rooms: [{
 #     room_key: str,
 #     author_id: int,
 #     message_id: int,   = To know when it was created coz snowflakes
-#     room_url: str
+#     room_url: str,
+#     link: Optional[str] = What the room was created for, if anything
 # }]
 
+# pool: [{
+#     room_key: str,
+#     created: float     = Unix time the room was created at
+# }]
+
+# Seconds between the passes removing expired rooms
+SWEEP_INTERVAL = 60
+# Limits of a page of the room list, well below the embed limits of discord
+ROOMS_PER_PAGE = 10
+PAGE_MAX_LENGTH = 2000
+# Limits of the pool settings of a guild
+POOL_MAX_SIZE = 20
+POOL_MAX_CONCURRENCY = 5
+# Seconds after which a room nobody took is thrown away, w2g.tv deletes
+# rooms nobody visits after a while
+POOL_MAX_AGE = 86400
+
+
+def room_line(number:int, room:dict) -> str:
+    '''
+    The line of a room in the room list. The time is a discord timestamp
+    so the line stays right without being rendered again.
+    '''
+    created = ((room["message_id"] >> 22) + discord.utils.DISCORD_EPOCH) // 1000
+    return f"[Room {number}]({room['room_url']}) (Created By - <@{room['author_id']}>, <t:{created}:R>)"
+
+
+
+def paginate(lines:List[str]) -> List[str]:
+    '''
+    Splits the lines into pages of at most ROOMS_PER_PAGE lines and
+    PAGE_MAX_LENGTH characters
+    '''
+    pages = []
+    page = []
+    length = 0
+    for line in lines:
+        if page and (len(page) == ROOMS_PER_PAGE or length + len(line) + 1 > PAGE_MAX_LENGTH):
+            pages.append("\n".join(page))
+            page = []
+            length = 0
+        page.append(line)
+        length += len(line) + 1
+    if page:
+        pages.append("\n".join(page))
+    return pages
+
+
+
+async def create_control(ctx, pages, controls, message, page, timeout, emoji):
+    '''
+    The menu control creating a new room
+    '''
+    try:
+        await message.clear_reactions()
+    except discord.HTTPException:
+        pass
+    return True
+
+
+
+class RoomIndex:
+    """
+    The rooms of a guild, ordered by the snowflake of the message that
+    created them, so the expired ones are always at the start
+    """
+
+    def __init__(self, rooms:List[dict]=None):
+        self.rooms = sorted(rooms or [], key=lambda room: room["message_id"])
+        self.ids = [room["message_id"] for room in self.rooms]
+        # link: the newest room created for it
+        self.links: Dict[str, dict] = {}
+        for room in self.rooms:
+            if room.get("link"):
+                self.links[room["link"]] = room
+        # (cutoff, pages) of the room list, until a room is added or expires
+        self._pages: Optional[Tuple[int, List[str]]] = None
+
+
+    def add(self, room:dict):
+        index = bisect.bisect(self.ids, room["message_id"])
+        self.ids.insert(index, room["message_id"])
+        self.rooms.insert(index, room)
+        self._pages = None
+        link = room.get("link")
+        if link and (link not in self.links
+                     or self.links[link]["message_id"] < room["message_id"]):
+            self.links[link] = room
+
+
+    def recent(self, link:str, ttl:int, now:datetime) -> Optional[dict]:
+        '''
+        The room created for the link in the last ttl seconds, if any
+
+        Parameters:
+        -----------
+        link: str
+            The link the room was created for
+        ttl: int
+            Seconds a room is handed out again for the same link, 0 to never
+        now: datetime
+            The current time, in naive UTC
+        '''
+        room = self.links.get(link)
+        if room is None or not ttl:
+            return None
+        created = discord.utils.snowflake_time(room["message_id"])
+        if now - created > timedelta(seconds=ttl):
+            return None
+        return room
+
+
+    def cutoff(self, expires:int, now:datetime) -> int:
+        '''
+        The index of the first room which isn't expired
+
+        Parameters:
+        -----------
+        expires: int
+            Seconds after which a room expires, 0 if they don't
+        now: datetime
+            The current time, in naive UTC
+        '''
+        if not expires:
+            return 0
+        oldest = discord.utils.time_snowflake(now - timedelta(seconds=expires), high=True)
+        return bisect.bisect(self.ids, oldest)
+
+
+    def pages(self, expires:int, now:datetime) -> List[str]:
+        '''
+        The pages of the list of the rooms that aren't expired, rendered
+        again only when a room was added or expired since the last call
+        '''
+        cutoff = self.cutoff(expires, now)
+        if self._pages is None or self._pages[0] != cutoff:
+            lines = [room_line(number, room) for number, room in enumerate(self.rooms[cutoff:], 1)]
+            self._pages = (cutoff, paginate(lines))
+        return self._pages[1]
+
+
+    def expire(self, expires:int, now:datetime) -> List[dict]:
+        '''
+        Removes the expired rooms
+
+        Returns:
+        --------
+        List[dict]
+            The rooms that were removed
+        '''
+        cutoff = self.cutoff(expires, now)
+        removed = self.rooms[:cutoff]
+        del self.rooms[:cutoff]
+        del self.ids[:cutoff]
+        if removed:
+            self._pages = None
+        for room in removed:
+            if room.get("link") and self.links.get(room["link"]) is room:
+                del self.links[room["link"]]
+        return removed
+
+
+class RoomPool:
+    """
+    Rooms created ahead of time without a link, so a room can be handed
+    out without waiting for Watch2Gether
+    """
+
+    def __init__(self, rooms:List[dict]=None, size:int=0, concurrency:int=1):
+        self.rooms = list(rooms or [])
+        self.size = size
+        self.concurrency = concurrency
+        self.hits = 0
+        self.misses = 0
+        # the task refilling the pool, if it is running
+        self.task: Optional[asyncio.Task] = None
+
+
+    @property
+    def missing(self) -> int:
+        return max(0, self.size - len(self.rooms))
+
+
+    @property
+    def refilling(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+    def prune(self, now:float) -> bool:
+        '''
+        Throws away the rooms older than POOL_MAX_AGE and the ones over
+        the size of the pool
+
+        Returns:
+        --------
+        bool
+            Whether any room was thrown away
+        '''
+        count = len(self.rooms)
+        self.rooms = [room for room in self.rooms if now - room["created"] < POOL_MAX_AGE][:self.size]
+        return len(self.rooms) != count
+
+
+    def take(self, now:float) -> Optional[str]:
+        '''
+        Takes the oldest room of the pool
+
+        Returns:
+        --------
+        Optional[str]
+            The stream key of the room, None if the pool is empty or disabled
+        '''
+        if not self.size:
+            return None
+        self.prune(now)
+        if not self.rooms:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.rooms.pop(0)["room_key"]
+
+
 
 BaseCog = getattr(commands, "Cog", object)
 
@@ -45,15 +273,205 @@ class Watch2Gether(BaseCog):
         self.bot = bot
         self.db = Config.get_conf(self, 233059161401720832, force_registration=True)
         self.db.register_guild(**guild_defaults)
-        self.session = aiohttp.ClientSession()
+        self.api = W2GClient()
+        # guild_id: the rooms of that guild, loaded on first use
+        self.rooms: Dict[int, RoomIndex] = {}
+        # guild_id: seconds after which the rooms of that guild expire
+        self.expires: Dict[int, int] = {}
+        # guild_id: seconds a room is handed out again for the same link
+        self.link_ttls: Dict[int, int] = {}
+        # (guild_id, link): the room being created for that link
+        self.creating: Dict[Tuple[int, str], asyncio.Future] = {}
+        # guild_id: the rooms created ahead of time for that guild
+        self.pools: Dict[int, RoomPool] = {}
+        # read once and then kept up to date by on_red_api_tokens_update
+        self.api_key: Optional[str] = None
+        self.api_key_loaded = False
+        self.sweep_rooms.start()
 
 
     def cog_unload(self):
+        self.sweep_rooms.cancel()
+        for pool in self.pools.values():
+            if pool.task is not None:
+                pool.task.cancel()
         self.close_cleanup.start()
 
     @tasks.loop(count=1)
     async def close_cleanup(self):
-        await self.session.close()
+        await self.api.close()
+
+
+    async def get_api_key(self) -> Optional[str]:
+        '''
+        The Watch2Gether API key, None if it isn't set
+        '''
+        if not self.api_key_loaded:
+            api_keys = await self.bot.get_shared_api_tokens("watch2gether")
+            self.api_key = api_keys.get("api_key")
+            self.api_key_loaded = True
+        return self.api_key
+
+
+    @commands.Cog.listener()
+    async def on_red_api_tokens_update(self, service_name:str, api_tokens:Dict[str, str]):
+        if service_name != "watch2gether":
+            return
+        self.api_key = api_tokens.get("api_key")
+        self.api_key_loaded = True
+        if self.api_key is not None:
+            # the pools stopped refilling while there was no key
+            for guild_id in list(self.pools):
+                self.refill(guild_id)
+
+
+    async def get_rooms(self, guild) -> RoomIndex:
+        '''
+        The room index of the guild, read from the config the first time
+        '''
+        index = self.rooms.get(guild.id)
+        if index is None:
+            data = await self.db.guild(guild).all()
+            # it could have been loaded by the sweeper meanwhile
+            index = self.load_guild(guild.id, data)
+        return index
+
+
+    def load_guild(self, guild_id:int, data:dict) -> RoomIndex:
+        '''
+        Loads the config of a guild, unless it is already loaded
+        '''
+        if guild_id in self.rooms:
+            return self.rooms[guild_id]
+        self.expires[guild_id] = data["expires"]
+        self.link_ttls[guild_id] = data["link_ttl"]
+        self.pools[guild_id] = RoomPool(data["pool"], data["pool_size"], data["pool_concurrency"])
+        index = self.rooms[guild_id] = RoomIndex(data["rooms"])
+        self.refill(guild_id)
+        return index
+
+
+    def refill(self, guild_id:int):
+        '''
+        Starts refilling the pool of the guild if it isn't full and
+        isn't being refilled already
+        '''
+        pool = self.pools.get(guild_id)
+        if pool is None or not pool.missing or pool.refilling:
+            return
+        pool.task = asyncio.ensure_future(self.fill_pool(guild_id, pool))
+
+
+    async def fill_pool(self, guild_id:int, pool:RoomPool):
+        '''
+        Creates rooms for the pool, pool.concurrency at a time, until it is
+        full. Stops at the first failure, the next sweep or taken room
+        tries again.
+        '''
+        api_key = await self.get_api_key()
+        if api_key is None:
+            return
+        while pool.missing:
+            batch = min(pool.missing, pool.concurrency)
+            results = await asyncio.gather(*(self.api.create_room(api_key) for _ in range(batch)),
+                                           return_exceptions=True)
+            room_keys = [result for result in results if isinstance(result, str)]
+            now = time.time()
+            # the pool could have been shrunk meanwhile
+            pool.rooms.extend({"room_key": room_key, "created": now}
+                              for room_key in room_keys[:pool.missing])
+            await self.db.guild_from_id(guild_id).pool.set(pool.rooms)
+            if len(room_keys) < batch:
+                errors = [result for result in results if isinstance(result, Exception)]
+                if not all(isinstance(error, W2GError) for error in errors):
+                    log.error("Refilling the room pool of guild %s failed", guild_id,
+                              exc_info=next(error for error in errors if not isinstance(error, W2GError)))
+                return
+
+
+    async def new_room(self, ctx, api_key:str, link:Optional[str]) -> dict:
+        '''
+        Creates a room through the API and stores it
+        '''
+        room_key = await self.api.create_room(api_key, link)
+        return await self.store_room(ctx, room_key, link)
+
+
+    async def store_room(self, ctx, room_key:str, link:Optional[str]) -> dict:
+        '''
+        Stores a room given out by the command
+        '''
+        room_url = f"https://w2g.tv/rooms/{room_key}"
+        room = {
+            "room_key": room_key,
+            "room_url": room_url,
+            "message_id": ctx.message.id,
+            "author_id": ctx.author.id,
+            "link": link
+        }
+        index = await self.get_rooms(ctx.guild)
+        index.add(room)
+        await self.db.guild(ctx.guild).rooms.set(index.rooms)
+        return room
+
+
+    async def get_room(self, ctx, api_key:str, link:Optional[str]) -> Tuple[dict, bool]:
+        '''
+        A room for the link. A room created for the same link in the last
+        link_ttl seconds is handed out again and people asking for the
+        same link at the same time all wait for the single room being created
+
+        Returns:
+        --------
+        Tuple[dict, bool]
+            The room and whether it was created for this call
+        '''
+        index = await self.get_rooms(ctx.guild)
+        if link is None:
+            pool = self.pools[ctx.guild.id]
+            room_key = pool.take(time.time())
+            self.refill(ctx.guild.id)
+            if room_key is None:
+                return await self.new_room(ctx, api_key, link), True
+            await self.db.guild(ctx.guild).pool.set(pool.rooms)
+            return await self.store_room(ctx, room_key, link), True
+
+        room = index.recent(link, self.link_ttls[ctx.guild.id], datetime.utcnow())
+        if room is not None:
+            return room, False
+
+        key = (ctx.guild.id, link)
+        future = self.creating.get(key)
+        if future is not None:
+            # shielded so one of the waiters being cancelled doesn't cancel it for all
+            return await asyncio.shield(future), False
+
+        future = asyncio.ensure_future(self.new_room(ctx, api_key, link))
+        self.creating[key] = future
+        future.add_done_callback(lambda _: self.creating.pop(key, None))
+        return await asyncio.shield(future), True
+
+
+    @tasks.loop(seconds=SWEEP_INTERVAL)
+    async def sweep_rooms(self):
+        if self.sweep_rooms.current_loop == 0:
+            guilds = await self.db.all_guilds()
+            for guild_id, data in guilds.items():
+                self.load_guild(guild_id, data)
+
+        now = datetime.utcnow()
+        # copied, guilds can be loaded while this awaits
+        for guild_id, index in list(self.rooms.items()):
+            if not index.expire(self.expires.get(guild_id, guild_defaults["expires"]), now):
+                continue
+            # a single write for all the rooms of the guild that expired
+            await self.db.guild_from_id(guild_id).rooms.set(index.rooms)
+
+        now = time.time()
+        for guild_id, pool in list(self.pools.items()):
+            if not pool.refilling and pool.prune(now):
+                await self.db.guild_from_id(guild_id).pool.set(pool.rooms)
+            self.refill(guild_id)
 
 
     @commands.command(aliases=["w2g"])
@@ -63,72 +481,57 @@ class Watch2Gether(BaseCog):
         '''
         Create a watch2gether room. If a link is provided then the room will be opened for that resource
         '''
-        api_keys = await self.bot.get_shared_api_tokens("watch2gether")
-        if api_keys.get("api_key") is None:
+        api_key = await self.get_api_key()
+        if api_key is None:
             return await ctx.send("The Watch2Gether API key has not been set. Set it with "
                                   f"`{ctx.prefix}set api watch2gether api_key,<api_key>` command")
-        api_key = api_keys["api_key"]
 
         if link is None:
-            running_rooms = await self.db.guild(ctx.guild).rooms()
-            if running_rooms:
-                now = datetime.utcnow()
-                room_strs = []
-                i = 1
-                for room in running_rooms:
-                    created_at = discord.utils.snowflake_time(room["message_id"])
-                    expires = await self.db.guild(ctx.guild).expires()
-                    if expires:
-                        if (now - created_at).total_seconds() > expires:
-                            async with self.db.guild(ctx.guild).rooms() as rooms:
-                                rooms.remove(room)
-                                running_rooms.remove(room)
-                                continue
-                    time_delta = human_timedelta(created_at, accuracy=1)
-                    string = f"[Room {i}]({room['room_url']}) (Created By - <@{room['author_id']}>, {time_delta})"
-                    i = i + 1
-                    room_strs.append(string)
-                if room_strs:
-                    embed_color = await ctx.embed_color()
+            index = await self.get_rooms(ctx.guild)
+            # the expired rooms the sweeper didn't remove yet are just skipped
+            pages = index.pages(self.expires[ctx.guild.id], datetime.utcnow())
+            if pages:
+                embed_color = await ctx.embed_color()
+                embeds = []
+                for i, page in enumerate(pages, 1):
                     embed = discord.Embed(color=embed_color,
-                                          title="Currently running rooms:")
-                    embed.description = "\n".join(room_strs)
-                    embed.set_footer(text="Click on any of the URLs above to enter the room.\n"
-                                          'If you want to create a new room, react with "+" on this message')
-                    message = await ctx.send(embed=embed)
-                    
-                    emojis = ["\N{HEAVY PLUS SIGN}", "\N{HEAVY MULTIPLICATION X}\N{VARIATION SELECTOR-16}"]
-                    start_adding_reactions(message, emojis)
-                    pred = ReactionPredicate.with_emojis(emojis,
-                                                         message=message,
-                                                         user=ctx.author)
-                    try:
-                        await self.bot.wait_for("reaction_add", check=pred, timeout=60.0)
-                    except asyncio.exceptions.TimeoutError:
-                        return await message.clear_reactions()
-                    else:
-                        if pred.result == 1:
-                            return await message.delete()
-
-        url = "https://w2g.tv/rooms/create.json"
-        data = {
-            "w2g_api_key": api_key,
-            "share": link
-        }
-        async with self.session.post(url, data=data) as resp:
-            jsondata = await resp.json()
+                                          title="Currently running rooms:",
+                                          description=page)
+                    footer = ("Click on any of the URLs above to enter the room.\n"
+                              'If you want to create a new room, react with "+" on this message')
+                    if len(pages) > 1:
+                        footer += f"\nPage {i}/{len(pages)}"
+                    embed.set_footer(text=footer)
+                    embeds.append(embed)
 
-        room_key = jsondata["streamkey"]
-        room_url = f"https://w2g.tv/rooms/{room_key}"
-        async with self.db.guild(ctx.guild).rooms() as rooms:
-            rooms.append({
-                "room_key": room_key,
-                "room_url": room_url,
-                "message_id": ctx.message.id,
-                "author_id": ctx.author.id
-            })
+                controls = {
+                    "\N{HEAVY PLUS SIGN}": create_control,
+                    "\N{HEAVY MULTIPLICATION X}\N{VARIATION SELECTOR-16}": close_menu,
+                }
+                if len(pages) > 1:
+                    controls = {
+                        "\N{LEFTWARDS BLACK ARROW}\N{VARIATION SELECTOR-16}": prev_page,
+                        **controls,
+                        "\N{BLACK RIGHTWARDS ARROW}\N{VARIATION SELECTOR-16}": next_page,
+                    }
+                # the menu returns True only when "+" was clicked
+                if await menu(ctx, embeds, controls, timeout=60.0) is not True:
+                    return
 
-        await ctx.send(f"New Watch2Gether room created: {room_url}")
+        if link is not None:
+            # links in <> don't embed on discord, the API wants them without
+            link = link.strip("<>")
+        try:
+            async with ctx.typing():
+                room, created = await self.get_room(ctx, api_key, link)
+        except W2GError as e:
+            return await ctx.send(str(e))
+
+        if created:
+            await ctx.send(f"New Watch2Gether room created: {room['room_url']}")
+        else:
+            await ctx.send(f"A room for that link was just created by <@{room['author_id']}>: {room['room_url']}",
+                           allowed_mentions=discord.AllowedMentions.none())
 
 
     @commands.group(autohelp=True)
@@ -149,7 +552,93 @@ class Watch2Gether(BaseCog):
             expires = await self.db.guild(ctx.guild).expires()
             return await ctx.send(f"Current expiry time is {expires} seconds")
         await self.db.guild(ctx.guild).expires.set(seconds)
+        await self.get_rooms(ctx.guild)
+        self.expires[ctx.guild.id] = seconds
         await ctx.send(f"Done! Set expiry time to {seconds:,d} seconds")
 
 
+    @w2gset.command(name="linkttl")
+    @commands.has_permissions(administrator=True)
+    async def link_ttl(self, ctx, seconds:int=None):
+        """
+        Set for how long the room created for a link is given out again when someone asks for the same link,
+        instead of creating another room. Set to 0 to disable. Run without seconds to see the current settings
+        """
+        if seconds is None:
+            link_ttl = await self.db.guild(ctx.guild).link_ttl()
+            return await ctx.send(f"Rooms are given out again for the same link for {link_ttl:,d} seconds")
+        if seconds < 0:
+            return await ctx.send("The time can't be negative!")
+        await self.db.guild(ctx.guild).link_ttl.set(seconds)
+        await self.get_rooms(ctx.guild)
+        self.link_ttls[ctx.guild.id] = seconds
+        await ctx.send(f"Done! Rooms are now given out again for the same link for {seconds:,d} seconds")
+
+
+
+
+
+    @w2gset.group(name="pool", autohelp=True)
+    @commands.has_permissions(administrator=True)
+    async def w2gset_pool(self, ctx):
+        """
+        Keep rooms created ahead of time, so `[p]w2g` without a link gives out a room at once
+        """
+        pass
+
+
+    @w2gset_pool.command(name="size")
+    @commands.has_permissions(administrator=True)
+    async def pool_size(self, ctx, size:int=None):
+        """
+        Set how many rooms are kept ready. Set to 0 to disable. Run without size to see the current settings
+        """
+        if size is None:
+            size = await self.db.guild(ctx.guild).pool_size()
+            return await ctx.send(f"{size} rooms are kept ready")
+        if not 0 <= size <= POOL_MAX_SIZE:
+            return await ctx.send(f"The size has to be between 0 and {POOL_MAX_SIZE}!")
+        await self.db.guild(ctx.guild).pool_size.set(size)
+        await self.get_rooms(ctx.guild)
+        pool = self.pools[ctx.guild.id]
+        pool.size = size
+        if not pool.refilling and pool.prune(time.time()):
+            await self.db.guild(ctx.guild).pool.set(pool.rooms)
+        self.refill(ctx.guild.id)
+        await ctx.send(f"Done! {size} rooms will be kept ready")
+
+
+    @w2gset_pool.command(name="concurrency")
+    @commands.has_permissions(administrator=True)
+    async def pool_concurrency(self, ctx, concurrency:int=None):
+        """
+        Set how many rooms are created at the same time when refilling the pool
+        Run without concurrency to see the current settings
+        """
+        if concurrency is None:
+            concurrency = await self.db.guild(ctx.guild).pool_concurrency()
+            return await ctx.send(f"The pool is refilled {concurrency} rooms at a time")
+        if not 1 <= concurrency <= POOL_MAX_CONCURRENCY:
+            return await ctx.send(f"The concurrency has to be between 1 and {POOL_MAX_CONCURRENCY}!")
+        await self.db.guild(ctx.guild).pool_concurrency.set(concurrency)
+        await self.get_rooms(ctx.guild)
+        self.pools[ctx.guild.id].concurrency = concurrency
+        await ctx.send(f"Done! The pool will be refilled {concurrency} rooms at a time")
+
 
+    @w2gset_pool.command(name="stats")
+    @commands.has_permissions(administrator=True)
+    async def pool_stats(self, ctx, reset:bool=False):
+        """
+        See how often a room was ready in the pool since the cog was loaded
+        Pass `yes` as reset to set the counts back to 0
+        """
+        await self.get_rooms(ctx.guild)
+        pool = self.pools[ctx.guild.id]
+        total = pool.hits + pool.misses
+        rate = f"{pool.hits / total:.0%}" if total else "-"
+        status = "refilling" if pool.refilling else "idle"
+        await ctx.send(f"Rooms ready: {len(pool.rooms)}/{pool.size} ({status}, {pool.concurrency} at a time)\n"
+                       f"Hits: {pool.hits:,d}, misses: {pool.misses:,d}, hit rate: {rate}")
+        if reset:
+            pool.hits = pool.misses = 0